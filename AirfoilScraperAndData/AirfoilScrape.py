@@ -1,9 +1,18 @@
 import math
 
 from bs4 import BeautifulSoup
-import requests
+import argparse
 import csv
 
+from crawlEngine import Crawler
+from fetchCache import add_cache_arguments, cache_from_arguments
+
+# Pages are fetched one at a time through the shared fetch layer, which keeps a copy of every page on disk
+parser = argparse.ArgumentParser()
+add_cache_arguments(parser)
+args = parser.parse_args()
+crawler = Crawler(rate=2.0, workers=1, cache=cache_from_arguments(args))
+
 file_path = "foil_data_new_pg1-80.csv"
 with open(file_path, mode="w", newline="") as file:
     writer = csv.writer(file)
@@ -17,7 +26,7 @@ pageNum = 0
 while (pageNum < 164):
 #while (pageNum < 3):
     starturl = "http://airfoiltools.com/search/index?m%5BtextSearch%5D=&m%5BmaxCamber%5D=&m%5BminCamber%5D=&m%5BmaxThickness%5D=&m%5BminThickness%5D=&m%5Bgrp%5D=&m%5Bsort%5D=1&m%5Bpage%5D=" + str(pageNum) + "&m%5Bcount%5D=1638"
-    page = requests.get(starturl)
+    page = crawler.get(starturl)
     # set soup to the page of the url
     soup = BeautifulSoup(page.text, 'html')
     # find the table of airfoils
@@ -34,7 +43,7 @@ while (pageNum < 164):
         # print(foilurl)
 
         # configure page for foil
-        foilpage = requests.get(foilurl)
+        foilpage = crawler.get(foilurl)
         foilsoup = BeautifulSoup(foilpage.text, 'html')
         foiltable = foilsoup.find('table', class_='polar')
         # selects the reynolds 200000 and Ncrit 9 option
@@ -48,7 +57,7 @@ while (pageNum < 164):
             # print(foildetailsurl)
 
             # set up details page
-            detailspage = requests.get(foildetailsurl)
+            detailspage = crawler.get(foildetailsurl)
             detailsoup = BeautifulSoup(detailspage.text, 'html')
             # pulls the link to the details csv
             detaillink = "http://airfoiltools.com" + \
@@ -56,17 +65,15 @@ while (pageNum < 164):
                              'a')[3].get("href")
             # print(detaillink)
 
-            # configures csv link (still in html format, but will convert to csv
-            downloadpage = requests.get(detaillink)
-            downloadsoup = BeautifulSoup(downloadpage.text, 'html')
-            # converts soup into text which is formatted as csv
-            downloadsoupstr = str(downloadsoup)
-            # print(downloadsoupstr)
+            # downloads the csv, which is plain text so it does not need to go through BeautifulSoup
+            downloadpage = crawler.get(detaillink)
+            downloadstr = downloadpage.text
+            # print(downloadstr)
 
             # This code goes through the data for the selected airfoil and finds the url, name, and data for alpha = 0 (sometimes not there so use 0.25 instead), 3, 5, 7.5, 10
 
             # Split the text into lines
-            lines = downloadsoupstr.strip().split('\n')
+            lines = downloadstr.strip().split('\n')
 
             for line in lines:
                 if line.startswith("Url"):
@@ -1,347 +1,339 @@
 # Imports
 ##############################
-import math
-from bs4 import BeautifulSoup
-import requests
+import argparse
 import csv
+import re
+from concurrent.futures import FIRST_COMPLETED, wait
+from urllib.parse import parse_qs, urlsplit
+import requests
 
-# Create CSV File
+from crawlEngine import Crawler
+from crawlManifest import CrawlManifest
+from crawlTelemetry import Telemetry
+from fetchCache import OfflineCacheMiss, add_cache_arguments, cache_from_arguments
+from polarParsers import ParsePool, parse_details_page, parse_polar_csv, parse_polar_links, parse_search_page
+from resultSink import ResultSink
+
+# Site Layout
 ##############################
-file_path = "foil_data_new_pg81-90.csv"
-with open(file_path, mode="w", newline="") as file:
-    writer = csv.writer(file)
+SITE_URL = "http://airfoiltools.com"
+SEARCH_PATH = "/search/index?m%5BtextSearch%5D=&m%5BmaxCamber%5D=&m%5BminCamber%5D=&m%5BmaxThickness%5D=&m%5BminThickness%5D=&m%5Bgrp%5D=&m%5Bsort%5D=1&m%5Bpage%5D={page}&m%5Bcount%5D=1638"
+
+# Row of the airfoil's polar table to use for each Reynolds number (all Ncrit 9)
+POLAR_ROWS = [(50000, "row0", 0), (100000, "row1", 0), (200000, "row0", 2), (500000, "row1", 2)]
 
-    # Write header row (optional)
-    header = ["Name", "Data Url", "Reynold's Number", "Alpha", "CL", "CD"]
-    writer.writerow(header)
+FOIL_PATH = "/airfoil/details?airfoil={name}"
+
+# Polar csv urls follow polar/csv?polar=xf-<name>-<Re>, with -n<Ncrit> on the end for any Ncrit other than 9
+POLAR_CSV_PATH = "/polar/csv?polar={key}"
+POLAR_KEY = re.compile(r"xf-(?P<name>.+)-(?P<reynolds>\d+)(?:-n(?P<ncrit>\d+))?")
+
+HEADER = ["Name", "Data Url", "Reynold's Number", "Alpha", "CL", "CD"]
+# Column types for Parquet output (the scraped values are kept as the csv's text otherwise)
+PARQUET_TYPES = {"Reynold's Number": "int64", "Alpha": "float64", "CL": "float64", "CD": "float64"}
 
 
 # Scrape Site for Airfoils
 ##############################
+# Pages are fetched on the crawler's threads and parsed by the parse pool (see polarParsers)
+
+# Function to get the urls of every airfoil listed on one search page.
+# revalidate asks the site whether a cached page has changed, so a delta run sees newly listed airfoils
+def get_foil_urls(crawler, parsers, pageNum, revalidate=False):
+    with crawler.telemetry.stage("search page"):
+        page = crawler.get(SITE_URL + SEARCH_PATH.format(page=pageNum), revalidate=revalidate)
+    # The partial url of each airfoil, made into the full url
+    return [SITE_URL + suburl for suburl in parsers.run(parse_search_page, page.text)]
 
-#Page number of airfoils
-pageNum = 81
-
-while (pageNum < 164):  # 164 pages as of 10/7/2024
-    starturl = "http://airfoiltools.com/search/index?m%5BtextSearch%5D=&m%5BmaxCamber%5D=&m%5BminCamber%5D=&m%5BmaxThickness%5D=&m%5BminThickness%5D=&m%5Bgrp%5D=&m%5Bsort%5D=1&m%5Bpage%5D=" + str(pageNum) + "&m%5Bcount%5D=1638"
-    page = requests.get(starturl)
-    # set soup to the page of the url
-    soup = BeautifulSoup(page.text, 'html')
-    # find the table of airfoils
-    options = soup.find('table', class_='afSearchResult')
-    # find where the right area in the table is
-    options = options.find_all('td', class_="cell3")
-    # navigate through all of the airfoils on the table
-    for i in range(0, len(options), 1):
-        # The partial url of the selected airfoil
-        suburl = options[i].find_all('a')[0].get("href")
-        # print(suburl)
-        # Full url of selected airfoil
-        foilurl = "http://airfoiltools.com" + suburl
-        # print(foilurl)
-
-        # configure page for foil
-        foilpage = requests.get(foilurl)
-        foilsoup = BeautifulSoup(foilpage.text, 'html')
-        foiltable = foilsoup.find('table', class_='polar')
 
 # Select Airfoil Data Listing
 ##############################
 
-        # selects the reynolds 50000 and Ncrit 9 option
-
-        try:
-            foilrow = foiltable.find_all('tr', class_="row0")[0]
-            # print(foilrow)
-            # Finds the partial url for foil details
-            foilcell = foilrow.find_all('td')[7].find('a').get("href")
-            foildetailsurl = "http://airfoiltools.com" + foilcell
-            #print(foildetailsurl)
-
-            # set up details page
-            detailspage = requests.get(foildetailsurl)
-            detailsoup = BeautifulSoup(detailspage.text, 'html')
-            # pulls the link to the details csv
-            detaillink = "http://airfoiltools.com" + \
-                         detailsoup.find('table', class_="details").find_all('tr')[1].find('td', class_="cell1").find_all(
-                             'a')[3].get("href")
-            #print(detaillink)
-
-            # configures csv link (still in html format, but will convert to csv
-            downloadpage = requests.get(detaillink)
-            downloadsoup = BeautifulSoup(downloadpage.text, 'html')
-            # converts soup into text which is formatted as csv
-            downloadsoupstr = str(downloadsoup)
-            #print(downloadsoupstr)
-
-            # This code goes through the data for the selected airfoil and finds the url, name, and data for alpha = 0 (sometimes not there so use 0.25 instead), 3, 5, 7.5, 10
-
-            # Split the text into lines
-            lines = downloadsoupstr.strip().split('\n')
-            zeroIndex = -1 #Index of the first
-            for line in lines:
-                if line.startswith("Url"):
-                    url = line
-
-            for line in lines:
-                if line.startswith("Airfoil"):
-                    airfoil = line
-
-            #Look for the zero degree alpha to know where to start getting data
-            for line in range(len(lines)):
-                if lines[line].startswith("0.00"):
-                    zeroIndex = line
-                    break
-                # Sometimes there is no zero degree alpha in the spec sheet- this replaces it with the .25 degree alpha
-                elif lines[line].startswith("0.250"):
-                    zeroIndex = line
-                    break
-
-            alphaRow = zeroIndex #Start at the index of the zero alpha
-            largestCL = -math.inf #Set the parameter for largest Cl
-            dataRow = lines[alphaRow].split(',') #Define the first row of data and split it by commas
-
-            while alphaRow < len(lines) and float(dataRow[1])>=largestCL: #Loop through the rows by alpha until the stall point, then stop
-                largestCL = float(dataRow[1])
-                data_to_write = [airfoil, url[4:], 50000, dataRow[0], dataRow[1], dataRow[2]]
-                with open(file_path, mode="a", newline="") as file:
-                    writer = csv.writer(file)
-                    writer.writerow(data_to_write)
-                alphaRow+=1
-                dataRow = lines[alphaRow].split(',')
-
-        except AttributeError:
-            print(
-                "Error: Could not find the table rows. Check if the HTML structure has changed or if the data is available.\n"+foilurl)
-            # Handle the error gracefully, perhaps by logging or notifying the user.
-        except IndexError:
-            print("Error: Index out of range. Make sure there are enough elements in the list before accessing them.\n"+foilurl)
-            # Handle the IndexError gracefully, perhaps by logging or notifying the user.
-
-
-
-
-        # selects the reynolds 100000 and Ncrit 9 option
-
-        try:
-            foilrow = foiltable.find_all('tr', class_="row1")[0]
-            # print(foilrow)
-            # Finds the partial url for foil details
-            foilcell = foilrow.find_all('td')[7].find('a').get("href")
-            foildetailsurl = "http://airfoiltools.com" + foilcell
-            # print(foildetailsurl)
-
-            # set up details page
-            detailspage = requests.get(foildetailsurl)
-            detailsoup = BeautifulSoup(detailspage.text, 'html')
-            # pulls the link to the details csv
-            detaillink = "http://airfoiltools.com" + \
-                         detailsoup.find('table', class_="details").find_all('tr')[1].find('td',
-                                                                                           class_="cell1").find_all(
-                             'a')[3].get("href")
-            # print(detaillink)
-
-            # configures csv link (still in html format, but will convert to csv
-            downloadpage = requests.get(detaillink)
-            downloadsoup = BeautifulSoup(downloadpage.text, 'html')
-            # converts soup into text which is formatted as csv
-            downloadsoupstr = str(downloadsoup)
-            # print(downloadsoupstr)
-
-            # This code goes through the data for the selected airfoil and finds the url, name, and data for alpha = 0 (sometimes not there so use 0.25 instead), 3, 5, 7.5, 10
-
-            # Split the text into lines
-            lines = downloadsoupstr.strip().split('\n')
-            zeroIndex = -1  # Index of the first
-            for line in lines:
-                if line.startswith("Url"):
-                    url = line
-
-            for line in lines:
-                if line.startswith("Airfoil"):
-                    airfoil = line
-
-            # Look for the zero degree alpha to know where to start getting data
-            for line in range(len(lines)):
-                if lines[line].startswith("0.00"):
-                    zeroIndex = line
-                    break
-                # Sometimes there is no zero degree alpha in the spec sheet- this replaces it with the .25 degree alpha
-                elif lines[line].startswith("0.250"):
-                    zeroIndex = line
-                    break
-
-            alphaRow = zeroIndex  # Start at the index of the zero alpha
-            largestCL = -math.inf  # Set the parameter for largest Cl
-            dataRow = lines[alphaRow].split(',')  # Define the first row of data and split it by commas
-
-            while alphaRow < len(lines) and float(
-                    dataRow[1]) >= largestCL:  # Loop through the rows by alpha until the stall point, then stop
-                largestCL = float(dataRow[1])
-                data_to_write = [airfoil, url[4:], 100000, dataRow[0], dataRow[1], dataRow[2]]
-                with open(file_path, mode="a", newline="") as file:
-                    writer = csv.writer(file)
-                    writer.writerow(data_to_write)
-                alphaRow += 1
-                dataRow = lines[alphaRow].split(',')
-
-        except AttributeError:
-            print(
-                "Error: Could not find the table rows. Check if the HTML structure has changed or if the data is available.\n"+foilurl)
-            # Handle the error gracefully, perhaps by logging or notifying the user.
-        except IndexError:
-            print("Error: Index out of range. Make sure there are enough elements in the list before accessing them.\n"+foilurl)
-            # Handle the IndexError gracefully, perhaps by logging or notifying the user.
-
-
-
-        # selects the reynolds 200000 and Ncrit 9 option
-
-        try:
-            foilrow = foiltable.find_all('tr', class_="row0")[2]
-            # print(foilrow)
-            # Finds the partial url for foil details
-            foilcell = foilrow.find_all('td')[7].find('a').get("href")
-            foildetailsurl = "http://airfoiltools.com" + foilcell
-            # print(foildetailsurl)
-
-            # set up details page
-            detailspage = requests.get(foildetailsurl)
-            detailsoup = BeautifulSoup(detailspage.text, 'html')
-            # pulls the link to the details csv
-            detaillink = "http://airfoiltools.com" + \
-                         detailsoup.find('table', class_="details").find_all('tr')[1].find('td',
-                                                                                           class_="cell1").find_all(
-                             'a')[3].get("href")
-            # print(detaillink)
-
-            # configures csv link (still in html format, but will convert to csv
-            downloadpage = requests.get(detaillink)
-            downloadsoup = BeautifulSoup(downloadpage.text, 'html')
-            # converts soup into text which is formatted as csv
-            downloadsoupstr = str(downloadsoup)
-            # print(downloadsoupstr)
-
-            # This code goes through the data for the selected airfoil and finds the url, name, and data for alpha = 0 (sometimes not there so use 0.25 instead), 3, 5, 7.5, 10
-
-            # Split the text into lines
-            lines = downloadsoupstr.strip().split('\n')
-            zeroIndex = -1  # Index of the first
-            for line in lines:
-                if line.startswith("Url"):
-                    url = line
-
-            for line in lines:
-                if line.startswith("Airfoil"):
-                    airfoil = line
-
-            # Look for the zero degree alpha to know where to start getting data
-            for line in range(len(lines)):
-                if lines[line].startswith("0.00"):
-                    zeroIndex = line
-                    break
-                # Sometimes there is no zero degree alpha in the spec sheet- this replaces it with the .25 degree alpha
-                elif lines[line].startswith("0.250"):
-                    zeroIndex = line
-                    break
-
-            alphaRow = zeroIndex  # Start at the index of the zero alpha
-            largestCL = -math.inf  # Set the parameter for largest Cl
-            dataRow = lines[alphaRow].split(',')  # Define the first row of data and split it by commas
-
-            while alphaRow < len(lines) and float(
-                    dataRow[1]) >= largestCL:  # Loop through the rows by alpha until the stall point, then stop
-                largestCL = float(dataRow[1])
-                data_to_write = [airfoil, url[4:], 200000, dataRow[0], dataRow[1], dataRow[2]]
-                with open(file_path, mode="a", newline="") as file:
-                    writer = csv.writer(file)
-                    writer.writerow(data_to_write)
-                alphaRow += 1
-                dataRow = lines[alphaRow].split(',')
-
-        except AttributeError:
+# Function to find the details page of each Reynolds number in the foil's polar table
+def get_details_urls(crawler, parsers, foilurl):
+    # configure page for foil
+    with crawler.telemetry.stage("foil page"):
+        foilpage = crawler.get(foilurl)
+    links = parsers.run(parse_polar_links, foilpage.text, [(rowClass, rowIndex) for _, rowClass, rowIndex in POLAR_ROWS])
+
+    details = []
+    for (reynolds, _, _), link in zip(POLAR_ROWS, links):
+        if isinstance(link, Exception):
+            crawler.telemetry.error("foil page", type(link).__name__, reynolds)
+        if isinstance(link, AttributeError):
             print(
                 "Error: Could not find the table rows. Check if the HTML structure has changed or if the data is available.\n" + foilurl)
-            # Handle the error gracefully, perhaps by logging or notifying the user.
-        except IndexError:
+        elif isinstance(link, IndexError):
             print(
                 "Error: Index out of range. Make sure there are enough elements in the list before accessing them.\n" + foilurl)
-            # Handle the IndexError gracefully, perhaps by logging or notifying the user.
-
-
-        # selects the reynolds 500000 and Ncrit 9 option
-
-        try:
-            foilrow = foiltable.find_all('tr', class_="row1")[2]
-            # print(foilrow)
-            # Finds the partial url for foil details
-            foilcell = foilrow.find_all('td')[7].find('a').get("href")
-            foildetailsurl = "http://airfoiltools.com" + foilcell
-            # print(foildetailsurl)
-
-            # set up details page
-            detailspage = requests.get(foildetailsurl)
-            detailsoup = BeautifulSoup(detailspage.text, 'html')
-            # pulls the link to the details csv
-            detaillink = "http://airfoiltools.com" + \
-                         detailsoup.find('table', class_="details").find_all('tr')[1].find('td',
-                                                                                           class_="cell1").find_all(
-                             'a')[3].get("href")
-            # print(detaillink)
-
-            # configures csv link (still in html format, but will convert to csv
-            downloadpage = requests.get(detaillink)
-            downloadsoup = BeautifulSoup(downloadpage.text, 'html')
-            # converts soup into text which is formatted as csv
-            downloadsoupstr = str(downloadsoup)
-            # print(downloadsoupstr)
-
-            # This code goes through the data for the selected airfoil and finds the url, name, and data for alpha = 0 (sometimes not there so use 0.25 instead), 3, 5, 7.5, 10
-
-            # Split the text into lines
-            lines = downloadsoupstr.strip().split('\n')
-            zeroIndex = -1  # Index of the first
-            for line in lines:
-                if line.startswith("Url"):
-                    url = line
-
-            for line in lines:
-                if line.startswith("Airfoil"):
-                    airfoil = line
-
-            # Look for the zero degree alpha to know where to start getting data
-            for line in range(len(lines)):
-                if lines[line].startswith("0.00"):
-                    zeroIndex = line
-                    break
-                # Sometimes there is no zero degree alpha in the spec sheet- this replaces it with the .25 degree alpha
-                elif lines[line].startswith("0.250"):
-                    zeroIndex = line
-                    break
-
-            alphaRow = zeroIndex  # Start at the index of the zero alpha
-            largestCL = -math.inf  # Set the parameter for largest Cl
-            dataRow = lines[alphaRow].split(',')  # Define the first row of data and split it by commas
-
-            while alphaRow < len(lines) and float(
-                    dataRow[1]) >= largestCL:  # Loop through the rows by alpha until the stall point, then stop
-                largestCL = float(dataRow[1])
-                data_to_write = [airfoil, url[4:], 500000, dataRow[0], dataRow[1], dataRow[2]]
-                with open(file_path, mode="a", newline="") as file:
-                    writer = csv.writer(file)
-                    writer.writerow(data_to_write)
-                alphaRow += 1
-                dataRow = lines[alphaRow].split(',')
-
-        except AttributeError:
-            print(
-                "Error: Could not find the table rows. Check if the HTML structure has changed or if the data is available.\n" + foilurl)
-            # Handle the error gracefully, perhaps by logging or notifying the user.
-        except IndexError:
-            print(
-                "Error: Index out of range. Make sure there are enough elements in the list before accessing them.\n" + foilurl)
-            # Handle the IndexError gracefully, perhaps by logging or notifying the user.
+        else:
+            details.append((reynolds, SITE_URL + link))
+    return details
+
+
+# Function to follow a details page to the polar csv and turn it into rows
+def get_polar(crawler, parsers, foildetailsurl, reynolds):
+    # set up details page and pull the link to the details csv
+    with crawler.telemetry.stage("details page"):
+        detailspage = crawler.get(foildetailsurl)
+    detaillink = SITE_URL + parsers.run(parse_details_page, detailspage.text)
 
+    # the csv is plain text, so it is parsed as text
+    with crawler.telemetry.stage("csv download"):
+        downloadpage = crawler.get(detaillink)
+    rows = parsers.run(parse_polar_csv, downloadpage.text, reynolds)
+    if rows is None:
+        raise IndexError("No polar data at " + detaillink)
+    return rows
 
-    pageNum = pageNum + 1
-    print(pageNum)
\ No newline at end of file
+
+# Direct Polar Download
+##############################
+
+# Function to get an airfoil's name (as used in its polar keys) from its foil page url
+def foil_name(foilurl):
+    return parse_qs(urlsplit(foilurl).query)["airfoil"][0]
+
+
+# Function to build the url of an airfoil's foil page from its name
+def foil_url(name):
+    return SITE_URL + FOIL_PATH.format(name=name)
+
+
+# Function to build the url of an airfoil's polar csv without visiting the foil or details pages
+def polar_csv_url(name, reynolds, ncrit=9):
+    key = "xf-" + name + "-" + str(reynolds)
+    if ncrit != 9:
+        key += "-n" + str(ncrit)
+    return SITE_URL + POLAR_CSV_PATH.format(key=key)
+
+
+# Function to split a polar csv url into the airfoil name, Reynolds number and Ncrit (None if it is not one)
+def parse_polar_url(url):
+    match = POLAR_KEY.fullmatch(parse_qs(urlsplit(url).query).get("polar", [""])[0])
+    if match is None:
+        return None
+    return match["name"], int(match["reynolds"]), int(match["ncrit"] or 9)
+
+
+# Function to download a polar csv straight from its url, walking the foil and details pages only if it is missing
+def get_direct_polar(crawler, parsers, payload):
+    with crawler.telemetry.stage("csv download"):
+        page = crawler.get(payload["csv"])
+    rows = None if page.status_code == 404 else parsers.run(parse_polar_csv, page.text, payload["reynolds"])
+    if rows is not None:
+        return rows
+    # The polar table only lists the Ncrit 9 polars the html walk knows how to find
+    detailsurl = dict(get_details_urls(crawler, parsers, payload["foil"])).get(payload["reynolds"])
+    if payload["ncrit"] != 9 or detailsurl is None:
+        raise IndexError("No polar for Re " + str(payload["reynolds"]) + " Ncrit " + str(payload["ncrit"]))
+    return get_polar(crawler, parsers, detailsurl, payload["reynolds"])
+
+
+# Crawl Units
+##############################
+# A crawl is made of three kinds of unit, each recorded in the manifest:
+#   page    - one search page, finds the airfoils on it and the next page
+#   airfoil - one foil page, finds the details page of each Reynolds number
+#   polar   - one Reynolds number of one airfoil, downloads the csv and stores its rows
+
+# settings holds the run's options: direct (skip the foil and details pages), polars (the (Re, Ncrit) pairs
+# to download in direct mode), delta (re-read the search listing for new airfoils) and parsers (the ParsePool)
+def run_unit(crawler, kind, payload, settings):
+    parsers = settings["parsers"]
+    if kind == "page":
+        return get_foil_urls(crawler, parsers, payload["page"], revalidate=settings["delta"])
+    if kind == "airfoil":
+        if settings["direct"]:
+            name = foil_name(payload["foil"])
+            return [{"reynolds": reynolds, "ncrit": ncrit, "csv": polar_csv_url(name, reynolds, ncrit)}
+                    for reynolds, ncrit in settings["polars"]]
+        return [{"reynolds": reynolds, "ncrit": 9, "details": detailsurl}
+                for reynolds, detailsurl in get_details_urls(crawler, parsers, payload["foil"])]
+    if "csv" in payload:
+        return get_direct_polar(crawler, parsers, payload)
+    return get_polar(crawler, parsers, payload["details"], payload["reynolds"])
+
+
+# Function to name a polar unit, foil url | Re (| Ncrit when it is not the default 9)
+def polar_key(foilurl, reynolds, ncrit):
+    key = foilurl + "|" + str(reynolds)
+    if ncrit != 9:
+        key += "|n" + str(ncrit)
+    return key
+
+
+# Function to record the result of a finished unit in the manifest
+def record_unit(manifest, kind, key, payload, result):
+    if kind == "page":
+        pageNum = payload["page"]
+        # Keep paging until a page comes back empty (or repeats the page before it)
+        previous = manifest.payload("page", str(pageNum - 1)) if pageNum else None
+        children = []
+        if result and (previous is None or previous.get("foils") != result):
+            children = [("airfoil", foilurl, {"page": pageNum, "position": position, "foil": foilurl})
+                        for position, foilurl in enumerate(result)]
+            children.append(("page", str(pageNum + 1), {"page": pageNum + 1}))
+        manifest.complete(kind, key, children, payload=dict(payload, foils=result))
+        print("Page " + str(pageNum) + ": " + str(len(result)) + " airfoils")
+    elif kind == "airfoil":
+        children = [("polar", polar_key(payload["foil"], polar["reynolds"], polar["ncrit"]),
+                     dict(payload, order=order, **polar))
+                    for order, polar in enumerate(result)]
+        manifest.complete(kind, key, children)
+    else:
+        sort_key = "%06d-%03d-%02d" % (payload["page"], payload["position"], payload["order"])
+        manifest.complete(kind, key, rows=result, sort_key=sort_key)
+
+
+# Delta Scrape
+##############################
+# A delta run starts from a polar dataset we already have. Its polars are loaded into the manifest as finished
+# units, then the search listing is read again and only the airfoils and Reynolds numbers that are missing are fetched.
+
+# Function to read the rows of a polar dataset (.csv or .parquet in the HEADER layout)
+def read_dataset(path):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for row in pq.read_table(path, columns=HEADER).to_pylist():
+            yield [row[name] for name in HEADER]
+        return
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+        next(reader)
+        yield from reader
+
+
+# Function to load the polars of existing datasets into the manifest, so the crawl only fetches what they lack.
+# A polar is only kept if its data url names the same airfoil and Reynolds number as its row, anything else is refetched
+def seed_from_datasets(manifest, paths, settings):
+    polars = {}
+    skipped = 0
+    for path in paths:
+        for row in read_dataset(path):
+            parsed = parse_polar_url(row[1])
+            if parsed is None or parsed[0] != row[0].split(",", 1)[-1] or parsed[1] != int(row[2]):
+                skipped += 1
+                continue
+            polars.setdefault(parsed, []).append(row)
+
+    # The html walk names its polars by Reynolds number alone, whatever Ncrit the polar table row had
+    wanted = settings["polars"] if settings["direct"] else [(reynolds, 9) for reynolds, _, _ in POLAR_ROWS]
+    airfoils = {}
+    for name, reynolds, ncrit in polars:
+        airfoils.setdefault(name, {})[(reynolds, ncrit if settings["direct"] else 9)] = (name, reynolds, ncrit)
+
+    loaded = 0
+    for position, (name, found) in enumerate(airfoils.items()):
+        foilurl = foil_url(name)
+        payload = {"page": -1, "position": position, "foil": foilurl}
+        for order, (reynolds, ncrit) in enumerate(wanted):
+            if (reynolds, ncrit) not in found:
+                continue
+            key = polar_key(foilurl, reynolds, ncrit)
+            if manifest.status("polar", key) == "done":
+                continue
+            manifest.add("polar", key, dict(payload, order=order, reynolds=reynolds, ncrit=ncrit))
+            manifest.complete("polar", key, rows=polars[found[(reynolds, ncrit)]],
+                              sort_key="%06d-%03d-%02d" % (-1, position, order))
+            loaded += 1
+        # An airfoil missing some Reynolds numbers is visited again to fetch just those
+        manifest.add("airfoil", foilurl, payload)
+        if all(wanted_polar in found for wanted_polar in wanted):
+            manifest.complete("airfoil", foilurl)
+    print("Loaded " + str(loaded) + " polars of " + str(len(airfoils)) + " airfoils, skipped " + str(skipped)
+          + " rows whose data url does not match")
+
+
+# Function to run every unit that still needs work, keeping the crawler's pool full
+def crawl(crawler, manifest, settings, in_flight_limit, max_attempts, max_pages=None):
+    in_flight = {}
+    while True:
+        # Finish polars before starting new airfoils, and airfoils before new pages, so rows land steadily
+        for kind in ("polar", "airfoil", "page"):
+            room = in_flight_limit - len(in_flight)
+            if room <= 0:
+                break
+            for key, payload in manifest.claim(kind, room, max_attempts):
+                # Pages past the limit are left pending for a later, longer run
+                if kind == "page" and max_pages is not None and payload["page"] >= max_pages:
+                    continue
+                in_flight[crawler.submit(run_unit, crawler, kind, payload, settings)] = (kind, key, payload)
+        if not in_flight:
+            return
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for job in done:
+            kind, key, payload = in_flight.pop(job)
+            try:
+                result = job.result()
+            except AttributeError:
+                print(
+                    "Error: Could not find the table rows. Check if the HTML structure has changed or if the data is available.\n" + payload.get("foil", key))
+                manifest.fail(kind, key, "AttributeError")
+                crawler.telemetry.error(kind, "AttributeError", payload.get("reynolds"))
+            except IndexError:
+                print(
+                    "Error: Index out of range. Make sure there are enough elements in the list before accessing them.\n" + payload.get("foil", key))
+                manifest.fail(kind, key, "IndexError")
+                crawler.telemetry.error(kind, "IndexError", payload.get("reynolds"))
+            except (OfflineCacheMiss, requests.RequestException) as error:
+                print("Error: Could not fetch page.\n" + str(error))
+                manifest.fail(kind, key, type(error).__name__ + ": " + str(error))
+                crawler.telemetry.error(kind, type(error).__name__, payload.get("reynolds"))
+            else:
+                with crawler.telemetry.stage("write"):
+                    record_unit(manifest, kind, key, payload, result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the alpha, CL and CD polars of every airfoil on airfoiltools.com. "
+                                                 "Progress is kept in a manifest so an interrupted crawl can be resumed "
+                                                 "by running the same command again.")
+    parser.add_argument("--site", default=SITE_URL,
+                        help="site to scrape, e.g. a local mockAirfoilServer for testing and benchmarks")
+    parser.add_argument("--output", default="foil_data_polars.csv",
+                        help="consolidated polar dataset (.csv, or .parquet for a Parquet file)")
+    parser.add_argument("--manifest", default="crawl_manifest.sqlite", help="crawl progress and scraped rows")
+    parser.add_argument("--max-attempts", type=int, default=3, help="give up on a unit after this many failed runs")
+    parser.add_argument("--max-pages", type=int, default=None, help="only crawl this many search pages")
+    parser.add_argument("--direct", action="store_true",
+                        help="download polar csvs straight from their urls, only visiting the foil page when one is missing")
+    parser.add_argument("--reynolds", type=int, nargs="+", default=[reynolds for reynolds, _, _ in POLAR_ROWS],
+                        help="Reynolds numbers to download in --direct mode")
+    parser.add_argument("--ncrit", type=int, nargs="+", default=[9], help="Ncrit values to download in --direct mode")
+    parser.add_argument("--delta", nargs="+", metavar="DATASET", default=None,
+                        help="existing polar datasets (.csv or .parquet); re-read the search listing and only fetch "
+                             "the airfoils and Reynolds numbers they are missing")
+    parser.add_argument("--rate", type=float, default=2.0, help="requests per second across all threads")
+    parser.add_argument("--burst", type=int, default=4, help="requests allowed back to back before the rate limit applies")
+    parser.add_argument("--per-host", type=int, default=4, help="requests open against the site at once")
+    parser.add_argument("--workers", type=int, default=8, help="units of work run at the same time")
+    parser.add_argument("--parse-workers", type=int, default=2, help="processes parsing pages (0 parses on the network threads)")
+    parser.add_argument("--report", default="crawl_report.json",
+                        help="run metrics: stage timings, request rate and error counts (.json, or .csv)")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    SITE_URL = args.site.rstrip("/")
+
+    telemetry = Telemetry()
+    with CrawlManifest(args.manifest) as manifest, ParsePool(args.parse_workers, telemetry) as parsers, \
+            Crawler(rate=args.rate, burst=args.burst, per_host=args.per_host, workers=args.workers,
+                    cache=cache_from_arguments(args), telemetry=telemetry) as crawler:
+        settings = {"direct": args.direct, "parsers": parsers, "delta": args.delta is not None,
+                    "polars": [(reynolds, ncrit) for reynolds in args.reynolds for ncrit in args.ncrit]}
+        manifest.add("page", "0", {"page": 0})
+        if args.delta is not None:
+            seed_from_datasets(manifest, args.delta, settings)
+            manifest.reset("page")
+        crawl(crawler, manifest, settings, in_flight_limit=args.workers * 2, max_attempts=args.max_attempts,
+              max_pages=args.max_pages)
+
+        # Write the consolidated dataset
+        with telemetry.stage("export"), ResultSink(args.output, HEADER, types=PARQUET_TYPES) as sink:
+            sink.write_many(manifest.rows())
+        print(manifest.counts())
+        for kind, key, attempts, error in manifest.failures():
+            print("Failed " + kind + " after " + str(attempts) + " attempts: " + key + " (" + str(error) + ")")
+    print(telemetry.summary())
+    telemetry.write_report(args.report)
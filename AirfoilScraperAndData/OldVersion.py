@@ -2,9 +2,18 @@
 # This was replaced by AirfoilScrape.py
 
 from bs4 import BeautifulSoup
-import requests
+import argparse
 import csv
 
+from crawlEngine import Crawler
+from fetchCache import add_cache_arguments, cache_from_arguments
+
+# Pages are fetched one at a time through the shared fetch layer, which keeps a copy of every page on disk
+parser = argparse.ArgumentParser()
+add_cache_arguments(parser)
+args = parser.parse_args()
+crawler = Crawler(rate=2.0, workers=1, cache=cache_from_arguments(args))
+
 file_path = "foil_data.csv"
 with open(file_path, mode="w", newline="") as file:
     writer = csv.writer(file)
@@ -17,7 +26,7 @@ pageNum = 0
 
 while (pageNum < 164):
     starturl = "http://airfoiltools.com/search/index?m%5BtextSearch%5D=&m%5BmaxCamber%5D=&m%5BminCamber%5D=&m%5BmaxThickness%5D=&m%5BminThickness%5D=&m%5Bgrp%5D=&m%5Bsort%5D=1&m%5Bpage%5D=" + str(pageNum) + "&m%5Bcount%5D=1638"
-    page = requests.get(starturl)
+    page = crawler.get(starturl)
     soup = BeautifulSoup(page.text, 'html.parser')
     options = soup.find('table', class_='afSearchResult')
 
@@ -28,7 +37,7 @@ while (pageNum < 164):
             suburl = options[i].find_all('a')[0].get("href")
             foilurl = "http://airfoiltools.com" + suburl
 
-            foilpage = requests.get(foilurl)
+            foilpage = crawler.get(foilurl)
             foilsoup = BeautifulSoup(foilpage.text, 'html.parser')
             foiltable = foilsoup.find('table', class_='polar')
 
@@ -40,7 +49,7 @@ while (pageNum < 164):
                     foilcell = foilrow.find_all('td')[7].find('a').get("href")
                     foildetailsurl = "http://airfoiltools.com" + foilcell
 
-                    detailspage = requests.get(foildetailsurl)
+                    detailspage = crawler.get(foildetailsurl)
                     detailsoup = BeautifulSoup(detailspage.text, 'html.parser')
                     details_table = detailsoup.find('table', class_="details")
 
@@ -48,11 +57,8 @@ while (pageNum < 164):
                         detaillink = "http://airfoiltools.com" + details_table.find_all('tr')[1].find('td', class_="cell1").find_all(
                                      'a')[3].get("href")
 
-                        downloadpage = requests.get(detaillink)
-                        downloadsoup = BeautifulSoup(downloadpage.text, 'html.parser')
-                        downloadsoupstr = str(downloadsoup)
-
-                        lines = downloadsoupstr.strip().split('\n')
+                        downloadpage = crawler.get(detaillink)
+                        lines = downloadpage.text.strip().split('\n')
 
                         airfoil = ""
                         url = ""
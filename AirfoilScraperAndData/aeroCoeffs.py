@@ -0,0 +1,65 @@
+# CL and CD lookup for the takeoff simulators
+# An AeroCoeffProvider is made once per airfoil from its polars ({Reynolds number: polar}, each polar a DataFrame or
+# dict with Alpha, CL and CD columns, as returned by the simulators' load_airfoil_data). Each polar is resampled up front onto the fixed alpha grid of polarResample.py,
+# so a lookup finds its alpha slot with index arithmetic and only its Reynolds number bracket with bisect, instead of
+# building new scipy interpolators on every timestep.
+
+import math
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from polarResample import ALPHA_START, ALPHA_STEP, alpha_grid, resample, stall_mask
+
+
+class AeroCoeffProvider:
+    """CL and CD of one airfoil at any Reynolds number and alpha.
+
+    Each polar is interpolated linearly in alpha (extrapolating past its ends), then the two polars either side of
+    the Reynolds number are blended linearly. Reynolds numbers outside the polars use the nearest polar.
+    """
+
+    def __init__(self, airfoil_data):
+        grid = alpha_grid()
+        self.reynolds = []
+        self.polars = []
+        for reynolds in sorted(airfoil_data):
+            polar = airfoil_data[reynolds]
+            alpha = np.asarray(polar["Alpha"])
+            cl, inside = resample(alpha, np.asarray(polar["CL"]), grid)
+            cd, _ = resample(alpha, np.asarray(polar["CD"]), grid)
+            stall, valid = stall_mask(cl, inside)
+            if stall < 0:
+                continue  # No data on the grid
+            first = int(valid.argmax())
+            self.reynolds.append(float(reynolds))
+            self.polars.append((first, int(stall), cl.tolist(), cd.tolist()))
+
+    @staticmethod
+    def interpolate(polar, values, alpha):
+        # Linear interpolation between the grid slots either side of alpha, kept inside the polar's valid slots so
+        # past its ends the first or last segment is extended (like scipy's interp1d(..., fill_value='extrapolate'))
+        first, last = polar[0], polar[1]
+        if first == last:
+            return values[first]
+        position = (alpha - ALPHA_START) / ALPHA_STEP
+        slot = min(max(math.floor(position), first), last - 1)
+        return values[slot] + (position - slot) * (values[slot + 1] - values[slot])
+
+    def coeffs(self, reynolds, alpha):
+        """(CL, CD) at a Reynolds number and alpha (degrees)."""
+        lower = max(bisect_right(self.reynolds, reynolds) - 1, 0)
+        upper = min(bisect_left(self.reynolds, reynolds), len(self.reynolds) - 1)
+
+        polar = self.polars[lower]
+        cl_lower = self.interpolate(polar, polar[2], alpha)
+        cd_lower = self.interpolate(polar, polar[3], alpha)
+        if lower == upper:
+            return cl_lower, cd_lower
+
+        polar = self.polars[upper]
+        cl_upper = self.interpolate(polar, polar[2], alpha)
+        cd_upper = self.interpolate(polar, polar[3], alpha)
+
+        re_ratio = (reynolds - self.reynolds[lower]) / (self.reynolds[upper] - self.reynolds[lower])
+        return cl_lower + re_ratio * (cl_upper - cl_lower), cd_lower + re_ratio * (cd_upper - cd_lower)
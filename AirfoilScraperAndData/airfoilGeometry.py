@@ -0,0 +1,162 @@
+# Airfoil geometry from coordinate files, stored in the polar database as polar_store/geometry.parquet
+# Every airfoil's coordinates are put onto the same chordwise stations, so thickness and camber of all airfoils are
+# worked out together as arrays of shape (airfoil, station). One row per airfoil:
+#   thickness, x_thickness - maximum thickness and where along the chord it is (fractions of chord)
+#   camber, x_camber       - maximum camber and where it is
+#   symmetric              - the camber line stays within 0.001 chord of the chord line
+#   reflexed               - the camber line rises again towards the trailing edge by more than 0.002 chord
+# The store's airfoil families (see polarDatabase.py) follow this table for every airfoil in it.
+#   python airfoilGeometry.py ingest --dat-dir coordinates     (Selig or Lednicer .dat files named <airfoil>.dat)
+#   python airfoilGeometry.py ingest --asb                     (every airfoil in the store, from aerosandbox)
+#   python airfoilGeometry.py show naca0018
+
+import argparse
+import glob
+import os
+
+import numpy as np
+
+from polarDatabase import DEFAULT_STORE, GEOMETRY_FILE, PolarDatabase, update_families
+
+GEOMETRY_COLUMNS = ["thickness", "x_thickness", "camber", "x_camber", "symmetric", "reflexed"]
+
+# Chordwise stations, bunched towards the leading and trailing edges like the coordinate files themselves
+STATIONS = 0.5 * (1 - np.cos(np.linspace(0, np.pi, 201)))
+
+SYMMETRIC_CAMBER = 0.001
+REFLEX_RISE = 0.002
+
+# Suffix airfoiltools.com adds to the names aerosandbox knows the airfoils by ("naca0018-il" -> "naca0018")
+SITE_SUFFIX = "-il"
+
+
+# Function to read a .dat coordinate file, Selig (one loop from the trailing edge over the top and back) or Lednicer
+# (point counts, then the upper and lower surfaces each from the leading edge), as an (n, 2) array in Selig order
+def read_dat(path):
+    rows = []
+    with open(path) as file:
+        for line in file:
+            parts = line.replace(",", " ").split()
+            if len(parts) != 2:
+                continue
+            try:
+                rows.append((float(parts[0]), float(parts[1])))
+            except ValueError:
+                continue  # The name line
+    coordinates = np.array(rows)
+    if len(coordinates) and coordinates[0, 0] > 1.5:
+        upper_count = int(coordinates[0, 0])
+        upper = coordinates[1:1 + upper_count]
+        lower = coordinates[1 + upper_count:]
+        coordinates = np.vstack([upper[::-1], lower])
+    return coordinates
+
+
+# Function to get the upper and lower surface heights of one airfoil at the stations, with the chord scaled to 1
+# from the leading edge (the point furthest forward)
+def surfaces(coordinates, stations=STATIONS):
+    leading_edge = int(np.argmin(coordinates[:, 0]))
+    x_le, y_le = coordinates[leading_edge]
+    chord = coordinates[:, 0].max() - x_le
+    x = (coordinates[:, 0] - x_le) / chord
+    y = (coordinates[:, 1] - y_le) / chord
+
+    heights = []
+    for side in (slice(None, leading_edge + 1), slice(leading_edge, None)):
+        order = np.argsort(x[side], kind="stable")
+        heights.append(np.interp(stations, x[side][order], y[side][order]))
+    return np.maximum(heights[0], heights[1]), np.minimum(heights[0], heights[1])
+
+
+# Function to work out the geometry table of any number of airfoils ({name: coordinates}). Each airfoil is put on
+# the stations on its own, then every measurement is taken over the whole (airfoil, station) array at once
+def geometry_table(coordinates):
+    import pandas as pd
+
+    names = sorted(coordinates)
+    upper = np.empty((len(names), len(STATIONS)))
+    lower = np.empty((len(names), len(STATIONS)))
+    for row, name in enumerate(names):
+        upper[row], lower[row] = surfaces(coordinates[name])
+
+    rows = np.arange(len(names))
+    thickness = upper - lower
+    camber = (upper + lower) / 2
+    thickest = thickness.argmax(axis=1)
+    most_camber = np.abs(camber).argmax(axis=1)
+    symmetric = np.abs(camber).max(axis=1) < SYMMETRIC_CAMBER
+    # Reflex: the lowest point of the camber line behind its maximum sits below the trailing edge
+    behind = np.arange(len(STATIONS)) >= most_camber[:, None]
+    lowest_behind = np.where(behind, camber, np.inf).min(axis=1)
+    reflexed = ~symmetric & (camber[:, -1] - lowest_behind > REFLEX_RISE)
+
+    return pd.DataFrame({"Airfoil": names, "thickness": thickness[rows, thickest], "x_thickness": STATIONS[thickest],
+                         "camber": camber[rows, most_camber], "x_camber": STATIONS[most_camber],
+                         "symmetric": symmetric, "reflexed": reflexed}, columns=["Airfoil"] + GEOMETRY_COLUMNS)
+
+
+# Function to read every .dat file in a directory as {airfoil name (the file name): coordinates}
+def dat_coordinates(dat_dir):
+    coordinates = {}
+    for path in sorted(glob.glob(os.path.join(dat_dir, "*.dat"))):
+        points = read_dat(path)
+        if len(points) < 3:
+            print("Skipping " + path + ", it has no coordinates")
+            continue
+        coordinates[os.path.splitext(os.path.basename(path))[0]] = points
+    return coordinates
+
+
+# Function to get coordinates from aerosandbox's own airfoil database (no network needed) for airfoils by name
+def asb_coordinates(names):
+    import aerosandbox as asb
+
+    coordinates = {}
+    for name in names:
+        short_name = name[:-len(SITE_SUFFIX)] if name.endswith(SITE_SUFFIX) else name
+        points = asb.Airfoil(short_name).coordinates
+        if points is None or len(points) < 3:
+            print("Skipping " + name + ", aerosandbox has no coordinates for it")
+            continue
+        coordinates[name] = np.asarray(points, dtype=np.float64)
+    return coordinates
+
+
+# Function to add airfoils' geometry to a store's geometry table (replacing any they already had there) and
+# reclassify the store's airfoil families from it
+def ingest(coordinates, store=DEFAULT_STORE):
+    import pandas as pd
+
+    if not coordinates:
+        print("No coordinates to ingest")
+        return
+    geometry = geometry_table(coordinates)
+    path = os.path.join(store, GEOMETRY_FILE)
+    if os.path.exists(path):
+        previous = pd.read_parquet(path)
+        geometry = pd.concat([previous[~previous["Airfoil"].isin(geometry["Airfoil"])], geometry])
+    geometry = geometry.sort_values("Airfoil").reset_index(drop=True)
+    geometry.to_parquet(path, index=False)
+    update_families(store)
+    print("Ingested " + str(len(coordinates)) + " airfoils into " + path + " (" + str(len(geometry)) + " in total)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Work out airfoil thickness, camber and reflex from coordinates")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = commands.add_parser("ingest", help="add airfoils' geometry to the polar store")
+    source = ingest_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dat-dir", help="directory of .dat coordinate files named after their airfoils")
+    source.add_argument("--asb", action="store_true", help="every airfoil in the store, from aerosandbox")
+    ingest_parser.add_argument("--store", default=DEFAULT_STORE)
+    show_parser = commands.add_parser("show", help="print the geometry of airfoils matching a name")
+    show_parser.add_argument("airfoil")
+    show_parser.add_argument("--store", default=DEFAULT_STORE)
+    args = parser.parse_args()
+
+    database = PolarDatabase(args.store)
+    if args.command == "ingest":
+        ingest(dat_coordinates(args.dat_dir) if args.dat_dir else asb_coordinates(database.airfoils()), args.store)
+    else:
+        geometry = database.geometry()
+        print(geometry[geometry["Airfoil"].str.contains(args.airfoil.lower(), regex=False)].to_string(index=False))
@@ -0,0 +1,158 @@
+# Shared network layer for the airfoil scrapers
+# Fetches pages from a pool of keep-alive sessions, caps how many requests are open against a host at once,
+# spaces requests out with a token bucket and retries failed requests with exponential backoff.
+# An optional fetchCache.FetchCache is checked before any request is made, and every request is recorded in a
+# crawlTelemetry.Telemetry.
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from crawlTelemetry import Telemetry
+
+# Status codes that are worth retrying (rate limited or a temporary server error)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+USER_AGENT = "SAEAeroToolbox airfoil scraper"
+
+
+class TokenBucket:
+    """Token bucket rate limiter. Refills at `rate` tokens per second up to `burst` tokens."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Crawler:
+    """Thread safe page fetcher with per-host concurrency limits, rate limiting and retries.
+
+    rate is the overall requests per second (None for no limit), per_host is the number of requests that
+    may be open against one host at a time and workers is the size of the thread pool used by submit/map.
+    cache is an optional FetchCache that responses are served from and stored to. telemetry collects the run's
+    request metrics (a new Telemetry if none is given).
+    """
+
+    def __init__(self, rate=2.0, burst=4, per_host=4, workers=8, retries=4, backoff=1.0, timeout=30, cache=None,
+                 telemetry=None):
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.telemetry = telemetry or Telemetry()
+        self.host_limits = {}
+        self.host_lock = threading.Lock()
+        self.local = threading.local()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    # Each thread keeps its own session so connections are reused (keep-alive) without sharing a session across threads
+    def session(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.per_host, pool_maxsize=self.per_host)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            self.local.session = session
+        return session
+
+    def host_limit(self, url):
+        host = urlsplit(url).netloc
+        with self.host_lock:
+            if host not in self.host_limits:
+                self.host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self.host_limits[host]
+
+    def retry_delay(self, attempt, response=None):
+        # Respect the server's Retry-After header when it sends one
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            return float(response.headers["Retry-After"])
+        return self.backoff * 2 ** attempt * (1 + random.random() * 0.5)
+
+    def get(self, url, revalidate=False):
+        """GET a url, retrying connection errors and retryable status codes. Returns the requests Response
+        (or a CachedResponse when the cache already holds the page). revalidate asks the server whether a cached
+        page has changed even if it is still within its ttl."""
+        headers = None
+        if self.cache is not None:
+            if not revalidate or self.cache.offline:
+                cached = self.cache.get(url)
+                if cached is not None:
+                    self.telemetry.cache_hit()
+                    return cached
+            # A stale or revalidated entry is fetched conditionally, so an unchanged page costs a 304 and no body
+            headers = self.cache.conditional_headers(url)
+        response = self.fetch(url, headers)
+        if self.cache is not None:
+            if response.status_code == 304:
+                return self.cache.refresh(url)
+            self.cache.store(url, response)
+        return response
+
+    def fetch(self, url, headers=None):
+        for attempt in range(self.retries + 1):
+            if self.bucket is not None:
+                with self.telemetry.stage("rate limit wait"):
+                    self.bucket.acquire()
+            response = None
+            try:
+                limit = self.host_limit(url)
+                with self.telemetry.stage("host wait"):
+                    limit.acquire()
+                try:
+                    with self.telemetry.stage("request"):
+                        response = self.session().get(url, headers=headers, timeout=self.timeout)
+                finally:
+                    limit.release()
+                self.telemetry.request(response)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                self.telemetry.error("request", type(error).__name__)
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS:
+                    return response
+                self.telemetry.error("request", "HTTP " + str(response.status_code))
+                if attempt == self.retries:
+                    response.raise_for_status()
+            with self.telemetry.stage("retry backoff"):
+                time.sleep(self.retry_delay(attempt, response))
+
+    def submit(self, fn, *args):
+        return self.pool.submit(fn, *args)
+
+    def map(self, fn, *iterables):
+        return self.pool.map(fn, *iterables)
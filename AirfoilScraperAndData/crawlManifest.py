@@ -0,0 +1,127 @@
+# Persistent work manifest for long airfoil crawls
+# Every unit of work (a search page, an airfoil, one Reynolds number polar) is a row in a SQLite database with its
+# status, so a crashed or stopped crawl resumes where it left off and only retries the units that failed.
+# The scraped polar rows are stored in the same database, in the same transaction that marks their unit done.
+
+import json
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_run INTEGER,
+    error TEXT,
+    updated REAL,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS units_status ON units (kind, status);
+CREATE TABLE IF NOT EXISTS polar_rows (
+    polar_key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    sort_key TEXT NOT NULL,
+    name TEXT,
+    url TEXT,
+    reynolds INTEGER,
+    alpha TEXT,
+    cl TEXT,
+    cd TEXT,
+    PRIMARY KEY (polar_key, seq)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL
+);
+"""
+
+
+class CrawlManifest:
+    """SQLite backed record of crawl units. Units are identified by (kind, key) and carry a JSON payload."""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        # Each run gets an id so a unit is tried at most once per run, failed units wait for the next run
+        self.run_id = self.db.execute("INSERT INTO runs (started) VALUES (?)", (time.time(),)).lastrowid
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, kind, key, payload=None):
+        """Add a pending unit. Units that already exist keep their status."""
+        with self.db:
+            self.db.execute("INSERT OR IGNORE INTO units (kind, key, payload, updated) VALUES (?, ?, ?, ?)",
+                            (kind, key, json.dumps(payload), time.time()))
+
+    def status(self, kind, key):
+        """The status of a unit, or None if it is not in the manifest."""
+        found = self.db.execute("SELECT status FROM units WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        return None if found is None else found[0]
+
+    def payload(self, kind, key):
+        found = self.db.execute("SELECT payload FROM units WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        return None if found is None else json.loads(found[0])
+
+    def reset(self, kind):
+        """Make every unit of a kind pending again, e.g. to re-read the search listing."""
+        with self.db:
+            self.db.execute("UPDATE units SET status = 'pending', attempts = 0, last_run = NULL WHERE kind = ?", (kind,))
+
+    def claim(self, kind, limit, max_attempts):
+        """Return up to limit (key, payload) units of a kind that still need work and mark them as tried this run."""
+        found = self.db.execute(
+            "SELECT key, payload FROM units WHERE kind = ? AND status != 'done' AND attempts < ? "
+            "AND (last_run IS NULL OR last_run != ?) ORDER BY rowid LIMIT ?",
+            (kind, max_attempts, self.run_id, limit)).fetchall()
+        with self.db:
+            self.db.executemany("UPDATE units SET last_run = ? WHERE kind = ? AND key = ?",
+                                [(self.run_id, kind, key) for key, _ in found])
+        return [(key, json.loads(payload)) for key, payload in found]
+
+    def complete(self, kind, key, children=(), rows=None, sort_key="", payload=None):
+        """Mark a unit done, add the units it discovered and store its output rows, all in one transaction.
+        Children that already exist keep their status but take the new payload. payload replaces the unit's own."""
+        with self.db:
+            self.db.execute("UPDATE units SET status = 'done', attempts = attempts + 1, error = NULL, updated = ? "
+                            "WHERE kind = ? AND key = ?", (time.time(), kind, key))
+            if payload is not None:
+                self.db.execute("UPDATE units SET payload = ? WHERE kind = ? AND key = ?", (json.dumps(payload), kind, key))
+            self.db.executemany("INSERT INTO units (kind, key, payload, updated) VALUES (?, ?, ?, ?) "
+                                "ON CONFLICT (kind, key) DO UPDATE SET payload = excluded.payload",
+                                [(childKind, childKey, json.dumps(childPayload), time.time())
+                                 for childKind, childKey, childPayload in children])
+            if rows is not None:
+                self.db.execute("DELETE FROM polar_rows WHERE polar_key = ?", (key,))
+                self.db.executemany("INSERT INTO polar_rows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                    [(key, seq, sort_key, *row) for seq, row in enumerate(rows)])
+
+    def fail(self, kind, key, error):
+        with self.db:
+            self.db.execute("UPDATE units SET status = 'failed', attempts = attempts + 1, error = ?, updated = ? "
+                            "WHERE kind = ? AND key = ?", (error, time.time(), kind, key))
+
+    def counts(self):
+        """Number of units of each kind in each status, as {kind: {status: count}}."""
+        counts = {}
+        for kind, status, count in self.db.execute("SELECT kind, status, COUNT(*) FROM units GROUP BY kind, status"):
+            counts.setdefault(kind, {})[status] = count
+        return counts
+
+    def failures(self):
+        return self.db.execute("SELECT kind, key, attempts, error FROM units WHERE status = 'failed' ORDER BY rowid").fetchall()
+
+    def rows(self):
+        """Every stored polar row, in crawl order."""
+        return self.db.execute("SELECT name, url, reynolds, alpha, cl, cd FROM polar_rows ORDER BY sort_key, seq")
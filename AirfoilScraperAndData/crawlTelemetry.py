@@ -0,0 +1,134 @@
+# Run metrics for the airfoil scrapers
+# Records how long each stage of the crawl takes (search page, foil page, details page, csv download, parse, write,
+# and inside the crawler the rate limit wait, host wait and the request itself), how many requests were made and
+# bytes downloaded, and how many errors of each class were hit for each Reynolds number.
+# The run report (JSON or csv) shows whether a crawl is bound by the network, parsing or the rate limit.
+
+import csv
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (milliseconds) of the latency histogram buckets, the last bucket takes everything slower
+HISTOGRAM_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+# Function to get a percentile from a sorted list of samples
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+class Telemetry:
+    """Thread safe collector of stage timings, request counts and error counters for one run."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.timings = {}
+        self.requests = 0
+        self.cache_hits = 0
+        self.not_modified = 0
+        self.bytes = 0
+        self.status = {}
+        self.errors = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Time the body of a with block as one sample of a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self.lock:
+            self.timings.setdefault(name, []).append(seconds)
+
+    def request(self, response):
+        """Count a response that came over the network."""
+        with self.lock:
+            self.requests += 1
+            self.bytes += len(response.content)
+            self.status[response.status_code] = self.status.get(response.status_code, 0) + 1
+            if response.status_code == 304:
+                self.not_modified += 1
+
+    def cache_hit(self):
+        with self.lock:
+            self.cache_hits += 1
+
+    def error(self, stage, error, reynolds=None):
+        """Count an error of a class (e.g. "IndexError") hit in a stage, for the polar's Reynolds number if known."""
+        key = (stage, error, reynolds)
+        with self.lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def report(self):
+        """The run's metrics as a dict."""
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            stages = {}
+            for name, samples in self.timings.items():
+                samples = sorted(samples)
+                histogram = {}
+                for bound in HISTOGRAM_MS:
+                    histogram["<=" + str(bound) + "ms"] = sum(1 for sample in samples if sample * 1000 <= bound)
+                histogram[">" + str(HISTOGRAM_MS[-1]) + "ms"] = sum(1 for sample in samples if sample * 1000 > HISTOGRAM_MS[-1])
+                # Bucket counts are cumulative up to the last bound, like a Prometheus histogram
+                stages[name] = {"count": len(samples), "total_seconds": sum(samples),
+                                "mean_ms": 1000 * sum(samples) / len(samples), "p50_ms": 1000 * percentile(samples, 0.5),
+                                "p90_ms": 1000 * percentile(samples, 0.9), "p99_ms": 1000 * percentile(samples, 0.99),
+                                "max_ms": 1000 * samples[-1], "histogram": histogram}
+            return {"elapsed_seconds": elapsed,
+                    "requests": {"count": self.requests, "per_second": self.requests / elapsed if elapsed else 0.0,
+                                 "bytes": self.bytes, "bytes_per_second": self.bytes / elapsed if elapsed else 0.0,
+                                 "cache_hits": self.cache_hits, "not_modified": self.not_modified,
+                                 "status": {str(status): count for status, count in sorted(self.status.items())}},
+                    "stages": stages,
+                    "errors": [{"stage": stage, "error": error, "reynolds": reynolds, "count": count}
+                               for (stage, error, reynolds), count in sorted(self.errors.items(), key=str)]}
+
+    def summary(self):
+        """One line per stage, for printing at the end of a run."""
+        report = self.report()
+        requests = report["requests"]
+        lines = ["%d requests in %.1f s (%.2f/s, %.1f kB, %d from cache)" % (
+            requests["count"], report["elapsed_seconds"], requests["per_second"], requests["bytes"] / 1000,
+            requests["cache_hits"])]
+        for name, stage in sorted(report["stages"].items(), key=lambda item: -item[1]["total_seconds"]):
+            lines.append("  %-16s %6d x  mean %8.1f ms  p90 %8.1f ms  total %8.1f s" % (
+                name, stage["count"], stage["mean_ms"], stage["p90_ms"], stage["total_seconds"]))
+        for error in report["errors"]:
+            lines.append("  %s in %s (Re %s): %d" % (error["error"], error["stage"], error["reynolds"], error["count"]))
+        return "\n".join(lines)
+
+    def write_report(self, path):
+        """Write the report as JSON, or as a flat section,name,field,value csv if the path ends in .csv."""
+        report = self.report()
+        if not path.endswith(".csv"):
+            with open(path, "w") as file:
+                json.dump(report, file, indent=2)
+            return
+        with open(path, mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["section", "name", "field", "value"])
+            writer.writerow(["run", "", "elapsed_seconds", report["elapsed_seconds"]])
+            for field, value in report["requests"].items():
+                if field == "status":
+                    for status, count in value.items():
+                        writer.writerow(["requests", "status", status, count])
+                else:
+                    writer.writerow(["requests", "", field, value])
+            for name, stage in report["stages"].items():
+                for field, value in stage.items():
+                    if field == "histogram":
+                        for bucket, count in value.items():
+                            writer.writerow(["histogram", name, bucket, count])
+                    else:
+                        writer.writerow(["stage", name, field, value])
+            for error in report["errors"]:
+                writer.writerow(["errors", error["stage"] + " " + error["error"], "Re " + str(error["reynolds"]), error["count"]])
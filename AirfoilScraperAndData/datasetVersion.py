@@ -0,0 +1,96 @@
+# Content hashes of datasets, and the inputs each derived file was made from
+# A dataset (a polar csv, a propeller .dat file, a whole directory of them) is identified by the sha256 of its
+# contents rather than its name or date, so copies and renames hash the same and a touched but unchanged file is not
+# a new version. Anything made from datasets records what it was made from in a sidecar next to it:
+#   takeoff_performance_results.csv.meta.json - {"inputs": {name: hash}, "parameters": {...}, "hash": ...}
+# and is_fresh tells a script whether a result it is about to recompute is already up to date.
+
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+META_SUFFIX = ".meta.json"
+CHUNK_SIZE = 1 << 20
+
+# Hashes already worked out in this process, by path, size and modification time
+hash_cache = {}
+
+
+# Function to get the sha256 of a file's contents. A file is only read again if its size or modification time changed
+def file_hash(path):
+    path = os.path.abspath(path)
+    status = os.stat(path)
+    stamp = (path, status.st_size, status.st_mtime_ns)
+    if stamp not in hash_cache:
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        hash_cache[stamp] = digest.hexdigest()
+    return hash_cache[stamp]
+
+
+# Function to combine named hashes ({name: hash}) into one, independent of the order they are given in
+def combined_hash(hashes):
+    digest = hashlib.sha256()
+    for name in sorted(hashes):
+        digest.update((str(name) + "=" + hashes[name] + "\n").encode())
+    return digest.hexdigest()
+
+
+# Function to hash a dataset: one file, or every file under a directory (by its path inside the directory)
+def dataset_hash(path):
+    if not os.path.isdir(path):
+        return file_hash(path)
+    hashes = {}
+    for folder, _, files in os.walk(path):
+        for name in files:
+            file_path = os.path.join(folder, name)
+            hashes[os.path.relpath(file_path, path).replace(os.sep, "/")] = file_hash(file_path)
+    return combined_hash(hashes)
+
+
+# Function to hash the numbers of one polar (or any arrays), so the same data hashes the same whatever file it was in
+def array_hash(*arrays):
+    digest = hashlib.sha256()
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+# Function to get the sidecar file of a derived file
+def meta_path(path):
+    return path + META_SUFFIX
+
+
+# Function to record what a derived file was made from. inputs maps names to dataset hashes, parameters is anything
+# else the result depends on (it must be json serialisable)
+def write_meta(path, inputs, parameters=None):
+    meta = {"inputs": inputs, "parameters": parameters, "hash": file_hash(path),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(meta_path(path) + ".tmp", "w") as file:
+        json.dump(meta, file, indent=1)
+    os.replace(meta_path(path) + ".tmp", meta_path(path))
+
+
+# Function to read a derived file's sidecar, or None if it has none
+def read_meta(path):
+    if not os.path.exists(meta_path(path)):
+        return None
+    with open(meta_path(path)) as file:
+        return json.load(file)
+
+
+# Function to check that a derived file exists, is unchanged since it was recorded, and was made from these inputs
+# and parameters, so it can be used instead of being made again
+def is_fresh(path, inputs, parameters=None):
+    meta = read_meta(path)
+    if meta is None or not os.path.exists(path):
+        return False
+    # Compared as they come back from json, so a tuple and a list of the same values are no different
+    expected = json.loads(json.dumps({"inputs": inputs, "parameters": parameters}))
+    return (meta["inputs"] == expected["inputs"] and meta["parameters"] == expected["parameters"]
+            and meta["hash"] == file_hash(path))
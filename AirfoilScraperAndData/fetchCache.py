@@ -0,0 +1,115 @@
+# On-disk HTTP response cache shared by the airfoil scrapers
+# Every response is stored gzip compressed under the sha256 hash of its url, so a re-run (or an --offline replay)
+# can rebuild the CSVs from disk instead of downloading every page again
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_cache")
+
+# Only responses that describe the page itself are worth keeping (a 404 tells us the page does not exist)
+CACHEABLE_STATUS = {200, 404}
+
+
+class OfflineCacheMiss(Exception):
+    """Raised in offline mode when a url has never been fetched."""
+
+
+class CachedResponse:
+    """The parts of a requests Response the scrapers use, rebuilt from a cache entry."""
+
+    def __init__(self, url, status_code, text, headers=None, fetched=None):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.fetched = fetched
+        self.from_cache = True
+
+
+class FetchCache:
+    """Content addressed response store. ttl is the age in seconds after which an entry is refetched (None keeps
+    entries forever). offline serves every entry regardless of age and never allows a network fetch."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=None, offline=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.offline = offline
+
+    def path(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + ".json.gz")
+
+    def load(self, url):
+        """Return the cache entry for a url as a dict, or None if it has never been stored."""
+        try:
+            with gzip.open(self.path(url), "rt", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def is_fresh(self, entry):
+        return self.offline or self.ttl is None or time.time() - entry["fetched"] < self.ttl
+
+    def get(self, url):
+        """Return a fresh CachedResponse for the url, or None if it has to be fetched."""
+        entry = self.load(url)
+        if entry is None or not self.is_fresh(entry):
+            if self.offline:
+                raise OfflineCacheMiss(url)
+            return None
+        return CachedResponse(entry["url"], entry["status"], entry["text"], entry["headers"], entry["fetched"])
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers from a stored entry, so the server can answer 304 Not Modified."""
+        entry = self.load(url)
+        if entry is None or entry["status"] != 200:
+            return {}
+        headers = {}
+        for stored, conditional in (("ETag", "If-None-Match"), ("Last-Modified", "If-Modified-Since")):
+            value = next((value for name, value in entry["headers"].items() if name.lower() == stored.lower()), None)
+            if value is not None:
+                headers[conditional] = value
+        return headers
+
+    def refresh(self, url):
+        """Restart the age of an entry the server has confirmed is unchanged (a 304) and return it."""
+        entry = self.load(url)
+        entry["fetched"] = time.time()
+        self.write(url, entry)
+        return CachedResponse(entry["url"], entry["status"], entry["text"], entry["headers"], entry["fetched"])
+
+    def store(self, url, response):
+        if response.status_code not in CACHEABLE_STATUS:
+            return
+        entry = {"url": url, "status": response.status_code, "fetched": time.time(),
+                 "headers": dict(response.headers), "text": response.text}
+        self.write(url, entry)
+
+    def write(self, url, entry):
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so a crash or another thread never sees half an entry
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(handle, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as file:
+            json.dump(entry, file)
+        os.replace(temp_path, path)
+
+
+# Function to add the cache options to a scraper's argument parser
+def add_cache_arguments(parser):
+    parser.add_argument("--offline", action="store_true", help="rebuild the output purely from the http cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--ttl-days", type=float, default=30, help="refetch cached pages older than this many days")
+    parser.add_argument("--no-cache", action="store_true", help="always download pages and do not store them")
+
+
+# Function to make the cache (or None) described by the parsed arguments
+def cache_from_arguments(args):
+    if args.no_cache and not args.offline:
+        return None
+    return FetchCache(args.cache_dir, ttl=args.ttl_days * 86400, offline=args.offline)
@@ -0,0 +1,203 @@
+# Local stand-in for airfoiltools.com
+# Serves the search, foil, details and polar csv pages the scrapers read, either made up (synthetic airfoils with a
+# simple lift curve) or replayed from a scraper http cache, with optional latency and injected errors.
+# Used to benchmark and test the scrapers without touching the real site, e.g.
+#   python mockAirfoilServer.py --port 8765 --latency 0.05 --error-rate 0.02
+#   python AirfoilScrapeMultipleReynoldsAoA.py --site http://127.0.0.1:8765 --no-cache
+
+import argparse
+import hashlib
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from fetchCache import FetchCache
+
+# Order of the (Re, Ncrit) rows in a foil page's polar table, laid out like the real site's, so the scraper's
+# POLAR_ROWS pick the Ncrit 9 polars
+TABLE_POLARS = [(50000, 9), (100000, 9), (50000, 5), (100000, 5), (200000, 9), (500000, 9), (200000, 5), (500000, 5),
+                (1000000, 9), (1000000, 5)]
+
+REAL_SITE = "http://airfoiltools.com"
+POLAR_KEY = re.compile(r"xf-(?P<name>.+)-(?P<reynolds>\d+)(?:-n(?P<ncrit>\d+))?")
+
+
+# Function to make a stable number in [0, 1) from a string, so the same airfoil always gets the same data
+def unit_hash(text):
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16) / 2 ** 32
+
+
+# Function to build the polar key of a polar, like the scrapers do
+def polar_key(name, reynolds, ncrit):
+    key = "xf-" + name + "-" + str(reynolds)
+    if ncrit != 9:
+        key += "-n" + str(ncrit)
+    return key
+
+
+class MockSite:
+    """The content of the stand-in site. pages x per_page synthetic airfoils, of which missing_rate of the polars
+    have no csv (a 404, like a polar the real site does not have)."""
+
+    def __init__(self, pages=3, per_page=10, missing_rate=0.0):
+        self.names = ["mock%04d-il" % index for index in range(pages * per_page)]
+        self.known = set(self.names)
+        self.per_page = per_page
+        self.missing_rate = missing_rate
+
+    def search_page(self, page):
+        names = self.names[page * self.per_page:(page + 1) * self.per_page]
+        if not names:
+            return "<html><body><p>No airfoils found</p></body></html>"
+        cells = "".join("<tr><td class='cell1'>%s</td><td class='cell3'><a href='/airfoil/details?airfoil=%s'>%s</a></td></tr>"
+                        % (name, name, name) for name in names)
+        return "<html><body><table class='afSearchResult'>" + cells + "</table></body></html>"
+
+    def foil_page(self, name):
+        if name not in self.known:
+            return None
+        rows = "".join("<tr class='row%d'>" % (index % 2) + "<td>-</td>" * 7
+                       + "<td><a href='/polar/details?polar=%s'>Details</a></td></tr>" % polar_key(name, reynolds, ncrit)
+                       for index, (reynolds, ncrit) in enumerate(TABLE_POLARS))
+        return "<html><body><table class='polar'>" + rows + "</table></body></html>"
+
+    def details_page(self, key):
+        return ("<html><body><table class='details'><tr><td>Polar</td></tr><tr><td class='cell1'>"
+                "<a href='#'>1</a><a href='#'>2</a><a href='#'>3</a><a href='/polar/csv?polar=%s'>csv</a>"
+                "</td></tr></table></body></html>" % key)
+
+    def polar_csv(self, key):
+        match = POLAR_KEY.fullmatch(key)
+        if match is None:
+            return None
+        name, reynolds, ncrit = match["name"], int(match["reynolds"]), int(match["ncrit"] or 9)
+        if name not in self.known or (reynolds, ncrit) not in TABLE_POLARS or unit_hash(key) < self.missing_rate:
+            return None
+        # A thin airfoil lift curve that stalls somewhere between 8 and 14 degrees
+        camber = 0.6 * unit_hash(name)
+        stall = 8 + 6 * unit_hash(name + "stall")
+        lines = ["Xfoil polar. Reynolds number fixed. Mach number fixed", "Polar key," + key, "Airfoil," + name,
+                 "Reynolds number,%d" % reynolds, "Ncrit,%d" % ncrit, "Mach,0", "Max Cl/Cd,0", "Max Cl/Cd alpha,0",
+                 "Url," + REAL_SITE + "/polar/csv?polar=" + key, " ", "Alpha,Cl,Cd,Cdp,Cm,Top_Xtr,Bot_Xtr"]
+        alpha = -5.0
+        while alpha <= 18:
+            cl = camber + 0.105 * alpha - 0.05 * max(0.0, alpha - stall) ** 2
+            cd = 0.008 + 50000 / reynolds * 0.004 + 0.0006 * alpha * alpha
+            lines.append("%.3f,%.4f,%.5f,%.5f,%.4f,%.4f,%.4f" % (alpha, cl, cd, cd * 0.6, -0.05 - camber / 10, 0.9, 1.0))
+            alpha += 0.25
+        return "\n".join(lines)
+
+    def page(self, path):
+        """The text of the page at a path (with its query string), or None for a 404."""
+        url = urlsplit(path)
+        path, query = url.path, parse_qs(url.query)
+        if path == "/search/index":
+            return self.search_page(int(query.get("m[page]", ["0"])[0]))
+        if path == "/airfoil/details":
+            return self.foil_page(query.get("airfoil", [""])[0])
+        if path == "/polar/details":
+            return self.details_page(query.get("polar", [""])[0])
+        if path == "/polar/csv":
+            return self.polar_csv(query.get("polar", [""])[0])
+        return None
+
+
+class ReplaySite:
+    """Serves pages recorded in a scraper http cache (fetched from the real site) instead of made up ones."""
+
+    def __init__(self, cache_dir, site=REAL_SITE):
+        self.cache = FetchCache(cache_dir, offline=True)
+        self.site = site
+
+    def page(self, path):
+        entry = self.cache.load(self.site + path)
+        if entry is None or entry["status"] != 200:
+            return None
+        return entry["text"]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Answers requests from the server's site, with the server's latency and error rate (see make_server)."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+        if random.random() < server.error_rate:
+            # A temporary failure the scrapers should retry
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        text = server.site.page(self.path)
+        with server.lock:
+            server.requests += 1
+        if text is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = text.encode("utf-8")
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain" if self.path.startswith("/polar/csv") else "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# Function to make a stand-in server. latency (+ up to jitter) seconds are added to every request and error_rate of
+# requests fail with a 503. Call serve_forever() on the result, or serve_in_thread() to run it in the background
+def make_server(host="127.0.0.1", port=8765, site=None, latency=0.0, jitter=0.0, error_rate=0.0):
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.site = site or MockSite()
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.requests = 0
+    server.lock = threading.Lock()
+    return server
+
+
+# Function to run a server on a background thread, returns the thread
+def serve_in_thread(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for airfoiltools.com")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=3, help="search pages of synthetic airfoils")
+    parser.add_argument("--per-page", type=int, default=10, help="airfoils on each search page")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="fraction of polars with no csv (404)")
+    parser.add_argument("--replay", metavar="CACHE_DIR", default=None,
+                        help="serve the pages recorded in a scraper http cache instead of synthetic ones")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many more seconds, at random")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 503")
+    args = parser.parse_args()
+
+    site = ReplaySite(args.replay) if args.replay else MockSite(args.pages, args.per_page, args.missing_rate)
+    server = make_server(args.host, args.port, site, args.latency, args.jitter, args.error_rate)
+    print("Serving a stand-in airfoiltools.com on http://%s:%d" % (args.host, server.server_port))
+    server.serve_forever()
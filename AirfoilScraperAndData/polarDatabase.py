@@ -0,0 +1,301 @@
+# Indexed polar database built from the scraped polar csvs
+# The polar format csvs (Name, Data Url, Reynold's Number, Alpha, CL, CD) are merged once into polar_store/:
+#   polars.parquet - every polar row, sorted by airfoil then Reynolds number, in row groups
+#   index.json     - the row range of every airfoil and of each of its Reynolds numbers, each airfoil's family bits,
+#                    and content hashes of each polar, each source csv and the whole store (see datasetVersion.py)
+#   metrics.parquet - CLmax, stall alpha, CL0, CD0, max L/D and more for every polar (see polarMetrics.py)
+#   geometry.parquet - thickness, camber and reflex of every airfoil with coordinates (see airfoilGeometry.py)
+# so loading one airfoil reads only the row groups it sits in instead of scanning and filtering a whole csv, and a
+# family of airfoils (e.g. database.view("symmetric")) is a set of row ranges rather than a csv of its own.
+#   python polarDatabase.py build                  (from every foil_data_*.csv next to this file)
+#   python polarDatabase.py build a.csv b.csv      (from chosen csvs, earlier files win where they overlap)
+
+import argparse
+import glob
+import json
+import os
+
+from datasetVersion import array_hash, combined_hash, file_hash
+from polarMetrics import FAMILIES, airfoil_families, geometry_families, metrics_table
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE = os.path.join(DATA_DIR, "polar_store")
+
+POLAR_FILE = "polars.parquet"
+INDEX_FILE = "index.json"
+METRICS_FILE = "metrics.parquet"
+GEOMETRY_FILE = "geometry.parquet"
+
+# Columns of the scraped polar csvs, the store adds the plain airfoil name in front of them
+CSV_COLUMNS = ["Name", "Data Url", "Reynold's Number", "Alpha", "CL", "CD"]
+COLUMNS = ["Airfoil"] + CSV_COLUMNS
+
+ROW_GROUP_SIZE = 16384
+
+
+# Function to get the plain airfoil name from the Name column ("Airfoil,naca0012-il" -> "naca0012-il")
+def airfoil_name(name):
+    return name.split(",", 1)[-1].strip()
+
+
+# Function to list the polar csvs a default build reads. Summary csvs (one row per airfoil) are left out
+def default_sources(data_dir=DATA_DIR):
+    sources = []
+    for path in sorted(glob.glob(os.path.join(data_dir, "foil_data_*.csv"))):
+        with open(path, newline="") as file:
+            if file.readline().strip().split(",")[3:4] == ["Alpha"]:
+                sources.append(path)
+    return sources
+
+
+# Function to build the store from polar csvs. Where two csvs hold the same airfoil and Reynolds number the polar
+# from the earlier csv is kept whole, so duplicate files (or rescrapes) never mix rows from two polars. A csv with
+# the same contents as an earlier one is not read at all
+def build(sources, store=DEFAULT_STORE, row_group_size=ROW_GROUP_SIZE):
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    frames = []
+    source_hashes = {}
+    for order, path in enumerate(sources):
+        content = file_hash(path)
+        if content in source_hashes.values():
+            print("Skipping " + path + ", it is a copy of an earlier csv")
+            continue
+        frame = pd.read_csv(path)
+        if list(frame.columns) != CSV_COLUMNS:
+            print("Skipping " + path + ", it is not a polar csv")
+            continue
+        source_hashes[os.path.basename(path)] = content
+        frame.insert(0, "Airfoil", frame["Name"].map(airfoil_name))
+        frame["source"] = order
+        frames.append(frame)
+    if not frames:
+        raise ValueError("No polar csvs to build the database from")
+
+    polars = pd.concat(frames, ignore_index=True)
+    first_source = polars.groupby(["Airfoil", "Reynold's Number"])["source"].transform("min")
+    polars = polars[polars["source"] == first_source]
+    # A stable sort keeps each polar's rows in their alpha order
+    polars = polars.sort_values(["Airfoil", "Reynold's Number"], kind="stable").reset_index(drop=True)[COLUMNS]
+    polars = polars.astype({"Reynold's Number": "int64", "Alpha": "float64", "CL": "float64", "CD": "float64"})
+
+    index = {}
+    starts = polars.groupby(["Airfoil", "Reynold's Number"], sort=False).indices
+    for (airfoil, reynolds), rows in starts.items():
+        entry = index.setdefault(airfoil, {"start": int(rows[0]), "stop": int(rows[-1]) + 1, "reynolds": {}})
+        entry["reynolds"][str(reynolds)] = [int(rows[0]), int(rows[-1]) + 1]
+        entry["stop"] = int(rows[-1]) + 1
+    # Each polar is hashed by its numbers, and the store by its polars, so rebuilding the same data from differently
+    # formatted or ordered csvs gives the same hashes
+    alpha, cl, cd = (polars[column].to_numpy() for column in ("Alpha", "CL", "CD"))
+    polar_hashes = {}
+    for airfoil, entry in index.items():
+        entry["hashes"] = {reynolds: array_hash(alpha[start:stop], cl[start:stop], cd[start:stop])
+                           for reynolds, (start, stop) in entry["reynolds"].items()}
+        polar_hashes.update({airfoil + "@" + reynolds: value for reynolds, value in entry["hashes"].items()})
+
+    os.makedirs(store, exist_ok=True)
+    set_families(index, write_metrics(polars, index, store), store)
+    pq.write_table(pa.Table.from_pandas(polars, preserve_index=False), os.path.join(store, POLAR_FILE),
+                   row_group_size=row_group_size)
+    with open(os.path.join(store, INDEX_FILE), "w") as file:
+        json.dump({"rows": len(polars), "sources": list(source_hashes), "source_hashes": source_hashes,
+                   "hash": combined_hash(polar_hashes), "airfoils": index}, file)
+    print("Built " + store + ": " + str(len(index)) + " airfoils, " + str(len(starts)) + " polars, "
+          + str(len(polars)) + " rows")
+
+
+# Function to work out and store the metrics table of a store's polars, returning it
+def write_metrics(polars, index, store):
+    metrics = metrics_table(polars, index)
+    metrics.to_parquet(os.path.join(store, METRICS_FILE), index=False)
+    return metrics
+
+
+# Function to set the family bits of every airfoil in an airfoil index: from the store's geometry table for the
+# airfoils it has, from the metrics table for the rest
+def set_families(index, metrics, store):
+    families = airfoil_families(metrics)
+    path = os.path.join(store, GEOMETRY_FILE)
+    if os.path.exists(path):
+        import pandas as pd
+
+        families.update(geometry_families(pd.read_parquet(path)))
+    for airfoil, family in families.items():
+        if airfoil in index:
+            index[airfoil]["family"] = family
+
+
+# Function to redo the family bits stored in a built store's index, after its geometry table has changed
+def update_families(store=DEFAULT_STORE):
+    database = PolarDatabase(store)
+    set_families(database.index, database.metrics(), store)
+    with open(os.path.join(store, INDEX_FILE)) as file:
+        index = json.load(file)
+    index["airfoils"] = database.index
+    with open(os.path.join(store, INDEX_FILE), "w") as file:
+        json.dump(index, file)
+
+
+# Function to check that a store was built from the current contents of the default polar csvs
+def sources_fresh(index, data_dir=DATA_DIR):
+    return set(index.get("source_hashes", {}).values()) == {file_hash(path) for path in default_sources(data_dir)}
+
+
+class PolarDatabase:
+    """Read access to a polar store. Lookups by airfoil name (and Reynolds number) read only the row groups that
+    hold those rows."""
+
+    def __init__(self, store=DEFAULT_STORE):
+        self.store = store
+        # The default store is built from the csvs next to this file the first time it is needed, and rebuilt
+        # whenever their contents change
+        index = None
+        if os.path.exists(os.path.join(store, INDEX_FILE)):
+            with open(os.path.join(store, INDEX_FILE)) as file:
+                index = json.load(file)
+        if os.path.abspath(store) == DEFAULT_STORE and (index is None or not sources_fresh(index)):
+            build(default_sources(), store)
+            with open(os.path.join(store, INDEX_FILE)) as file:
+                index = json.load(file)
+        if index is None:
+            raise FileNotFoundError("No polar store at " + store)
+        self.index = index["airfoils"]
+        self.rows = index["rows"]
+        self.hash = index.get("hash")
+        self.file = None
+        self.group_starts = None
+        self.metrics_frame = None
+
+    def parquet(self):
+        if self.file is None:
+            import pyarrow.parquet as pq
+
+            self.file = pq.ParquetFile(os.path.join(self.store, POLAR_FILE), memory_map=True)
+            counts = [self.file.metadata.row_group(group).num_rows for group in range(self.file.num_row_groups)]
+            self.group_starts = [sum(counts[:group]) for group in range(len(counts) + 1)]
+        return self.file
+
+    def airfoils(self, family=None):
+        """Airfoil names, all of them or only those in a family ("symmetric", "cambered" or "reflexed")."""
+        if family is None:
+            return sorted(self.index)
+        bit = FAMILIES[family]
+        families = self.families()
+        return sorted(name for name in self.index if families[name] & bit)
+
+    def families(self):
+        """The family bitmask of every airfoil (see polarMetrics.FAMILIES). Stores built before families were
+        stored work them out from the metrics table."""
+        if any("family" not in entry for entry in self.index.values()):
+            set_families(self.index, self.metrics(), self.store)
+        return {name: entry["family"] for name, entry in self.index.items()}
+
+    def reynolds(self, airfoil):
+        return sorted(int(reynolds) for reynolds in self.index[airfoil]["reynolds"])
+
+    def match(self, pattern):
+        """Airfoil names containing pattern (case insensitive), an exact match first. The pattern may be given like
+        the csvs' Name column ("Airfoil,naca0012-il")."""
+        pattern = airfoil_name(pattern).lower()
+        found = sorted(name for name in self.index if pattern in name.lower())
+        return sorted(found, key=lambda name: name.lower() != pattern)
+
+    def row_range(self, airfoil=None, reynolds=None):
+        if airfoil is None:
+            return 0, self.rows
+        entry = self.index[airfoil]
+        if reynolds is None:
+            return entry["start"], entry["stop"]
+        return tuple(entry["reynolds"][str(int(reynolds))])
+
+    def table(self, airfoil=None, reynolds=None):
+        """The rows of one polar, one airfoil (every Reynolds number) or the whole store, as a pyarrow Table.
+        Raises KeyError for an airfoil or Reynolds number the store does not have."""
+        start, stop = self.row_range(airfoil, reynolds)
+        parquet = self.parquet()
+        groups = [group for group in range(parquet.num_row_groups)
+                  if self.group_starts[group] < stop and self.group_starts[group + 1] > start]
+        if not groups:
+            return parquet.schema_arrow.empty_table()
+        rows = parquet.read_row_groups(groups)
+        return rows.slice(start - self.group_starts[groups[0]], stop - start)
+
+    def frame(self, airfoil=None, reynolds=None):
+        """Like table, as a pandas DataFrame with the columns of the scraped csvs (plus Airfoil)."""
+        return self.table(airfoil, reynolds).to_pandas()
+
+    def view(self, family):
+        """The rows of every airfoil in a family as one pyarrow Table, sliced out of the store without a copy."""
+        import pyarrow as pa
+
+        table = self.table()
+        ranges = [self.row_range(name) for name in self.airfoils(family)]
+        if not ranges:
+            return table.slice(0, 0)
+        return pa.concat_tables([table.slice(start, stop - start) for start, stop in ranges])
+
+    def metrics(self, airfoil=None, reynolds=None):
+        """The metrics table (see polarMetrics.py) as a DataFrame, for every polar or only those of one airfoil
+        and/or Reynolds number. Stores built before the table existed get it the first time it is asked for."""
+        import pandas as pd
+
+        if self.metrics_frame is None:
+            path = os.path.join(self.store, METRICS_FILE)
+            if not os.path.exists(path):
+                write_metrics(self.frame(), self.index, self.store)
+            self.metrics_frame = pd.read_parquet(path)
+        metrics = self.metrics_frame
+        if airfoil is not None:
+            metrics = metrics[metrics["Airfoil"] == airfoil]
+        if reynolds is not None:
+            metrics = metrics[metrics["Reynold's Number"] == int(reynolds)]
+        return metrics.reset_index(drop=True)
+
+    def geometry(self, airfoil=None):
+        """The geometry table (see airfoilGeometry.py) as a DataFrame, for every airfoil or only one. Empty when no
+        coordinates have been ingested into the store."""
+        import pandas as pd
+
+        from airfoilGeometry import GEOMETRY_COLUMNS
+
+        path = os.path.join(self.store, GEOMETRY_FILE)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=["Airfoil"] + GEOMETRY_COLUMNS)
+        geometry = pd.read_parquet(path)
+        if airfoil is not None:
+            geometry = geometry[geometry["Airfoil"] == airfoil]
+        return geometry.reset_index(drop=True)
+
+    def airfoil_data(self, airfoil):
+        """One airfoil's polars as {Reynolds number: DataFrame}."""
+        frame = self.frame(airfoil)
+        return {reynolds: frame[frame["Reynold's Number"] == reynolds].reset_index(drop=True)
+                for reynolds in frame["Reynold's Number"].unique()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect the indexed polar database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="build the store from polar csvs")
+    build_parser.add_argument("sources", nargs="*", help="polar csvs (default: every foil_data_*.csv in polar format)")
+    build_parser.add_argument("--store", default=DEFAULT_STORE)
+    show_parser = commands.add_parser("show", help="print the polars of one airfoil")
+    show_parser.add_argument("airfoil")
+    show_parser.add_argument("--store", default=DEFAULT_STORE)
+    list_parser = commands.add_parser("list", help="list the airfoils, or those of one family")
+    list_parser.add_argument("--family", choices=list(FAMILIES), default=None)
+    list_parser.add_argument("--store", default=DEFAULT_STORE)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.sources or default_sources(), args.store)
+    elif args.command == "list":
+        for name in PolarDatabase(args.store).airfoils(args.family):
+            print(name)
+    else:
+        database = PolarDatabase(args.store)
+        for name in database.match(args.airfoil)[:1]:
+            print(database.frame(name))
@@ -0,0 +1,79 @@
+# Derived metrics of every polar in the polar database
+# Worked out once when the database is built (see polarDatabase.build) and stored as polar_store/metrics.parquet,
+# one row per airfoil and Reynolds number, so screening scripts read a small table instead of the polars:
+#   cl_max, alpha_stall - highest CL and the alpha it is reached at
+#   cl0, cd0            - CL and CD at 0 degrees alpha (NaN when the polar does not reach 0 degrees)
+#   ld_max, alpha_ld_max - best CL/CD and its alpha
+#   cl_alpha            - lift curve slope (per degree), a straight line fit of CL from 0 to 5 degrees
+#   symmetric           - CL at 0 degrees within 0.005 of zero (the test getJustSymmetrical.py has always used)
+# Each airfoil also gets a family bitmask (FAMILIES), stored in the database index so subsets are views over the
+# store rather than copies of it: symmetric if any of its polars is, cambered otherwise. Airfoils whose coordinates
+# have been ingested (see airfoilGeometry.py) are classified from their geometry instead, which also finds reflex
+
+import numpy as np
+
+METRIC_COLUMNS = ["cl_max", "alpha_stall", "cl0", "cd0", "ld_max", "alpha_ld_max", "cl_alpha", "symmetric"]
+
+SYMMETRIC_CL0 = 0.005
+LINEAR_RANGE = (0.0, 5.0)
+
+# Family bits of an airfoil. An airfoil is in a family when family & FAMILIES[name] is set
+FAMILIES = {"symmetric": 1, "cambered": 2, "reflexed": 4}
+
+
+# Function to get a polar's value at an alpha, or NaN if the polar does not cover it
+def value_at(alpha, values, at):
+    if len(alpha) == 0 or at < alpha[0] or at > alpha[-1]:
+        return np.nan
+    return float(np.interp(at, alpha, values))
+
+
+# Function to work out the metrics of one polar from its alpha, CL and CD arrays (sorted by alpha)
+def polar_metrics(alpha, cl, cd):
+    stall = int(np.argmax(cl))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lift_to_drag = np.where(cd > 0, cl / cd, np.nan)
+    best = int(np.nanargmax(lift_to_drag)) if np.isfinite(lift_to_drag).any() else None
+
+    linear = (alpha >= LINEAR_RANGE[0]) & (alpha <= min(LINEAR_RANGE[1], alpha[stall]))
+    slope = float(np.polyfit(alpha[linear], cl[linear], 1)[0]) if linear.sum() >= 2 else np.nan
+
+    cl0 = value_at(alpha, cl, 0.0)
+    return {"cl_max": float(cl[stall]), "alpha_stall": float(alpha[stall]),
+            "cl0": cl0, "cd0": value_at(alpha, cd, 0.0),
+            "ld_max": np.nan if best is None else float(lift_to_drag[best]),
+            "alpha_ld_max": np.nan if best is None else float(alpha[best]),
+            "cl_alpha": slope, "symmetric": bool(abs(cl0) < SYMMETRIC_CL0)}
+
+
+# Function to build the metrics table of every polar. polars is the database's polar table (a DataFrame sorted
+# by airfoil and Reynolds number) and index its airfoil index ({airfoil: {"reynolds": {Re: [start, stop]}}})
+def metrics_table(polars, index):
+    import pandas as pd
+
+    alpha = polars["Alpha"].to_numpy(dtype=np.float64)
+    cl = polars["CL"].to_numpy(dtype=np.float64)
+    cd = polars["CD"].to_numpy(dtype=np.float64)
+    rows = []
+    for airfoil in sorted(index):
+        for reynolds, (start, stop) in sorted(index[airfoil]["reynolds"].items(), key=lambda item: int(item[0])):
+            order = np.argsort(alpha[start:stop], kind="stable") + start
+            rows.append(dict({"Airfoil": airfoil, "Reynold's Number": int(reynolds)},
+                             **polar_metrics(alpha[order], cl[order], cd[order])))
+    return pd.DataFrame(rows, columns=["Airfoil", "Reynold's Number"] + METRIC_COLUMNS)
+
+
+# Function to work out the family bitmask of every airfoil from the metrics table, in one pass over its rows
+def airfoil_families(metrics):
+    symmetric = {}
+    for airfoil, is_symmetric in zip(metrics["Airfoil"], metrics["symmetric"]):
+        symmetric[airfoil] = symmetric.get(airfoil, False) or bool(is_symmetric)
+    return {airfoil: FAMILIES["symmetric"] if is_symmetric else FAMILIES["cambered"]
+            for airfoil, is_symmetric in symmetric.items()}
+
+
+# Function to work out the family bitmask of every airfoil in the geometry table (see airfoilGeometry.py)
+def geometry_families(geometry):
+    return {airfoil: (FAMILIES["symmetric"] if symmetric else FAMILIES["cambered"])
+            | (FAMILIES["reflexed"] if reflexed else 0)
+            for airfoil, symmetric, reflexed in zip(geometry["Airfoil"], geometry["symmetric"], geometry["reflexed"])}
@@ -0,0 +1,132 @@
+# Parsers for the pages the airfoil scrapers download
+# Each parser pulls out only the cells the scraper needs with lxml's C parser and XPath, and the polar csv is read
+# as plain text, instead of building a full BeautifulSoup tree for every page. Parsers are plain functions of the
+# page text so they can run in a separate process pool from the network threads (see ParsePool).
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import lxml.html
+
+
+# XPath test for an element having a class (matches BeautifulSoup's class_= behaviour with multiple classes)
+def has_class(name):
+    return "contains(concat(' ', normalize-space(@class), ' '), ' " + name + " ')"
+
+
+# Function to get the partial url of every airfoil on a search page. Pages past the last one have no table
+def parse_search_page(text):
+    tree = lxml.html.fromstring(text)
+    tables = tree.xpath("//table[" + has_class("afSearchResult") + "]")
+    if not tables:
+        return []
+    return [cell.xpath(".//a")[0].get("href") for cell in tables[0].xpath(".//td[" + has_class("cell3") + "]")]
+
+
+# Function to get the details page link of the requested rows of a foil's polar table.
+# rows is a list of (row class, index) pairs. Each result is the partial url, or the AttributeError / IndexError
+# the lookup hit, so the caller can report a missing Reynolds number without losing the others.
+def parse_polar_links(text, rows):
+    tree = lxml.html.fromstring(text)
+    tables = tree.xpath("//table[" + has_class("polar") + "]")
+    links = []
+    for rowClass, rowIndex in rows:
+        try:
+            if not tables:
+                raise AttributeError("No polar table")
+            foilrow = tables[0].xpath(".//tr[" + has_class(rowClass) + "]")[rowIndex]
+            anchors = foilrow.xpath(".//td")[7].xpath(".//a")
+            if not anchors:
+                raise AttributeError("No details link")
+            links.append(anchors[0].get("href"))
+        except (AttributeError, IndexError) as error:
+            links.append(error)
+    return links
+
+
+# Function to get the csv link from a polar details page
+def parse_details_page(text):
+    tree = lxml.html.fromstring(text)
+    tables = tree.xpath("//table[" + has_class("details") + "]")
+    if not tables:
+        raise AttributeError("No details table")
+    cells = tables[0].xpath(".//tr")[1].xpath(".//td[" + has_class("cell1") + "]")
+    if not cells:
+        raise AttributeError("No csv link cell")
+    return cells[0].xpath(".//a")[3].get("href")
+
+
+# Function to turn the lines of a polar csv into output rows, from alpha = 0 up to the stall point
+def polar_rows(lines, reynolds):
+    for line in lines:
+        if line.startswith("Url"):
+            url = line
+
+    for line in lines:
+        if line.startswith("Airfoil"):
+            airfoil = line
+
+    # Look for the zero degree alpha to know where to start getting data
+    zeroIndex = -1
+    for line in range(len(lines)):
+        if lines[line].startswith("0.00"):
+            zeroIndex = line
+            break
+        # Sometimes there is no zero degree alpha in the spec sheet- this replaces it with the .25 degree alpha
+        elif lines[line].startswith("0.250"):
+            zeroIndex = line
+            break
+
+    rows = []
+    alphaRow = zeroIndex  # Start at the index of the zero alpha
+    largestCL = -math.inf  # Set the parameter for largest Cl
+    dataRow = lines[alphaRow].split(',')  # Define the first row of data and split it by commas
+
+    while float(dataRow[1]) >= largestCL:  # Loop through the rows by alpha until the stall point, then stop
+        largestCL = float(dataRow[1])
+        rows.append([airfoil, url[4:], reynolds, dataRow[0], dataRow[1], dataRow[2]])
+        alphaRow += 1
+        if alphaRow >= len(lines):
+            break
+        dataRow = lines[alphaRow].split(',')
+    return rows
+
+
+# Function to parse a downloaded polar csv (plain text, no html parsing needed).
+# Returns None when the page is not a polar csv (the site's page for a polar that does not exist)
+def parse_polar_csv(text, reynolds):
+    lines = text.strip().splitlines()
+    if not any(line.startswith("Alpha") for line in lines):
+        return None
+    return polar_rows(lines, reynolds)
+
+
+class ParsePool:
+    """Runs parsers in a pool of worker processes so parsing does not hold the GIL the network threads need.
+    With workers = 0 the parsers run inline on the calling thread. Each parse is timed as the "parse" stage of
+    telemetry (a crawlTelemetry.Telemetry) when one is given."""
+
+    def __init__(self, workers=0, telemetry=None):
+        self.pool = ProcessPoolExecutor(max_workers=workers) if workers else None
+        self.telemetry = telemetry
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+
+    def run(self, parser, *args):
+        if self.telemetry is None:
+            return self.call(parser, *args)
+        with self.telemetry.stage("parse"):
+            return self.call(parser, *args)
+
+    def call(self, parser, *args):
+        if self.pool is None:
+            return parser(*args)
+        return self.pool.submit(parser, *args).result()
@@ -0,0 +1,106 @@
+# Fast start reader for the compiled polar tensor (see polarTensor.py)
+# Needs only numpy and the standard library, so a quick lookup or a new worker process does not pay for importing
+# pandas, pyarrow or scipy. The tensor's arrays are opened memory mapped and only the polars asked for are read:
+#   reader = PolarReader()
+#   reader.airfoil_data(reader.match("naca0018")[0])   -> {Reynolds number: {"Alpha": ..., "CL": ..., "CD": ...}}
+# The default tensor is compiled from the polar store (which does need pandas and pyarrow) only if it does not exist
+# yet, or the store or its csvs have changed since (checked by content hash, see datasetVersion.py).
+
+import json
+import os
+
+import numpy as np
+
+from polarDatabase import DATA_DIR, DEFAULT_STORE, airfoil_name, sources_fresh
+
+DEFAULT_TENSOR = os.path.join(DATA_DIR, "polar_tensor")
+
+INDEX_FILE = "index.json"
+
+
+# Function to read the index of a tensor or store directory, or None if it has none
+def read_index(directory):
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+# Function to check that a tensor index was compiled from the default store as it is now, and the store from the
+# current polar csvs
+def store_matches(index, store=DEFAULT_STORE):
+    store_index = read_index(store)
+    return store_index is not None and sources_fresh(store_index) and index.get("store_hash") == store_index.get("hash")
+
+
+# Function to turn a float32 tensor value back into the decimal it was read from (the csvs hold at most 5
+# significant figures, which float32 keeps exactly), e.g. 0.029 rather than 0.028999999165534973
+def decimal(value):
+    return float(str(np.float32(value)))
+
+
+# Function to do the same as decimal for a whole array
+def decimals(values):
+    return np.asarray(values, dtype=np.float32).astype(str).astype(np.float64)
+
+
+class PolarReader:
+    """Read access to a compiled tensor: its axes, and the polars of one airfoil. cl, cd and mask are read only
+    memory maps, so any number of processes can open the same tensor without copying it."""
+
+    def __init__(self, tensor_dir=DEFAULT_TENSOR):
+        # The default tensor is compiled from the default polar store the first time it is needed, and again
+        # whenever the store's data changes
+        index = read_index(tensor_dir)
+        if os.path.abspath(tensor_dir) == DEFAULT_TENSOR and (index is None or not store_matches(index)):
+            from polarTensor import build
+
+            build()
+            index = read_index(tensor_dir)
+        if index is None:
+            raise FileNotFoundError("No polar tensor at " + tensor_dir)
+        self.tensor_dir = tensor_dir
+        self.airfoils = index["airfoils"]
+        self.reynolds = index["reynolds"]
+        grid = index["alpha"]
+        self.alpha = grid["start"] + grid["step"] * np.arange(grid["count"])
+        self.alpha_step = grid["step"]
+        self.airfoil_slots = {name: slot for slot, name in enumerate(self.airfoils)}
+        self.reynolds_slots = {value: slot for slot, value in enumerate(self.reynolds)}
+        self.cl = np.load(os.path.join(tensor_dir, "cl.npy"), mmap_mode="r")
+        self.cd = np.load(os.path.join(tensor_dir, "cd.npy"), mmap_mode="r")
+        self.mask = np.load(os.path.join(tensor_dir, "mask.npy"), mmap_mode="r")
+
+    def match(self, pattern):
+        """Airfoil names containing pattern (case insensitive), an exact match first. The pattern may be given like
+        the csvs' Name column ("Airfoil,naca0012-il")."""
+        pattern = airfoil_name(pattern).lower()
+        found = sorted(name for name in self.airfoils if pattern in name.lower())
+        return sorted(found, key=lambda name: name.lower() != pattern)
+
+    def alpha_slot(self, alpha):
+        """Index of alpha on the grid (from its position, no search), or None if alpha is not a grid point."""
+        slot = int(round((alpha - self.alpha[0]) / self.alpha_step))
+        if 0 <= slot < len(self.alpha) and abs(self.alpha[slot] - alpha) < 1e-9:
+            return slot
+        return None
+
+    def polar(self, airfoil, reynolds):
+        """The alpha, CL and CD arrays of one polar (only the grid points that hold data).
+        Raises KeyError for an airfoil or Reynolds number the tensor does not have."""
+        cell = (self.airfoil_slots[airfoil], self.reynolds_slots[int(reynolds)])
+        valid = self.mask[cell]
+        return self.alpha[valid], self.cl[cell][valid], self.cd[cell][valid]
+
+    def airfoil_data(self, airfoil):
+        """One airfoil's polars as {Reynolds number: {"Alpha": array, "CL": array, "CD": array}}, indexed the same
+        way as the DataFrames of PolarDatabase.airfoil_data."""
+        slot = self.airfoil_slots[airfoil]
+        data = {}
+        for reynolds_slot, reynolds in enumerate(self.reynolds):
+            valid = self.mask[slot, reynolds_slot]
+            if valid.any():
+                data[reynolds] = {"Alpha": self.alpha[valid], "CL": decimals(self.cl[slot, reynolds_slot][valid]),
+                                  "CD": decimals(self.cd[slot, reynolds_slot][valid])}
+        return data
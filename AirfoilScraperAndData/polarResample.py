@@ -0,0 +1,41 @@
+# Resampling of polars onto one fixed alpha grid
+# The scraped polars have uneven alpha spacing and lengths (some start at 0.25 degrees instead of 0, each stops at
+# its own stall point), so every consumer used to search each polar for its alpha. Resampled onto the grid
+# ALPHA_START..ALPHA_STOP every ALPHA_STEP degrees, every polar is an array of the same shape with a validity mask,
+# and the value at any alpha is found from its grid position with index arithmetic:
+#   slot = (alpha - ALPHA_START) / ALPHA_STEP
+# Used by polarTensor.build (every polar at once) and aeroCoeffs.AeroCoeffProvider (one airfoil's polars).
+
+import numpy as np
+
+ALPHA_START = -5.0
+ALPHA_STOP = 20.0
+ALPHA_STEP = 0.25
+
+
+# Function to make the alpha grid, from start to stop inclusive
+def alpha_grid(start=ALPHA_START, stop=ALPHA_STOP, step=ALPHA_STEP):
+    return start + step * np.arange(int(round((stop - start) / step)) + 1)
+
+
+# Function to resample one polar onto the grid. Returns the resampled values (NaN outside the polar's alpha range)
+# and the mask of grid points inside that range
+def resample(alpha, values, grid):
+    order = np.argsort(alpha, kind="stable")
+    alpha = np.asarray(alpha, dtype=np.float64)[order]
+    values = np.asarray(values, dtype=np.float64)[order]
+    inside = (grid >= alpha[0] - 1e-9) & (grid <= alpha[-1] + 1e-9)
+    resampled = np.full(grid.shape, np.nan)
+    resampled[inside] = np.interp(grid[inside], alpha, values)
+    return resampled, inside
+
+
+# Function to find the stall point of any number of resampled polars at once. cl and mask have the alpha grid as
+# their last axis. The stall slot is the last valid slot before CL first drops (the last valid slot when it never
+# does, -1 for a polar with no data). Returns the stall slots and the mask cut off past them
+def stall_mask(cl, mask):
+    drops = (np.diff(cl, axis=-1) < 0) & mask[..., :-1] & mask[..., 1:]
+    last = mask.shape[-1] - 1 - mask[..., ::-1].argmax(axis=-1)
+    stall = np.where(drops.any(axis=-1), drops.argmax(axis=-1), last)
+    stall = np.where(mask.any(axis=-1), stall, -1)
+    return stall, mask & (np.arange(mask.shape[-1]) <= stall[..., None])
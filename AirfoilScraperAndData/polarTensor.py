@@ -0,0 +1,156 @@
+# Dense coefficient tensor compiled from the polar database
+# CL and CD of every airfoil at every Reynolds number are resampled onto the fixed alpha grid of polarResample.py
+# (-5 to 20 degrees every 0.25 by default) as float32 arrays of shape (airfoil, Reynolds number, alpha), with a mask
+# of which cells hold data up to the polar's stall point (the rest are NaN):
+#   polar_tensor/cl.npy, cd.npy, mask.npy - the arrays, opened memory mapped so worker processes share one copy
+#   polar_tensor/index.json               - the airfoil names, Reynolds numbers and alpha grid of the axes
+#   python polarTensor.py build    (from the default polar_store, see polarDatabase.py)
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from polarDatabase import DEFAULT_STORE, PolarDatabase
+from polarReader import DEFAULT_TENSOR, INDEX_FILE, PolarReader
+from polarResample import ALPHA_START, ALPHA_STEP, ALPHA_STOP, alpha_grid, resample, stall_mask
+
+
+# Function to compile a polar store into a tensor directory. Each polar is linearly interpolated onto the alpha
+# grid between its first and last alpha, then cut off at its stall point (the last alpha before CL first drops);
+# grid points outside that are NaN and False in the mask
+def build(store=DEFAULT_STORE, tensor_dir=DEFAULT_TENSOR, alpha_start=ALPHA_START, alpha_stop=ALPHA_STOP,
+          alpha_step=ALPHA_STEP):
+    database = PolarDatabase(store)
+    polars = database.table()
+    alpha_column = polars.column("Alpha").to_numpy()
+    cl_column = polars.column("CL").to_numpy()
+    cd_column = polars.column("CD").to_numpy()
+
+    airfoils = database.airfoils()
+    reynolds = sorted({int(value) for airfoil in airfoils for value in database.index[airfoil]["reynolds"]})
+    alpha = alpha_grid(alpha_start, alpha_stop, alpha_step)
+    count = len(alpha)
+
+    shape = (len(airfoils), len(reynolds), count)
+    os.makedirs(tensor_dir, exist_ok=True)
+    # Written straight into memory mapped .npy files so the tensor never has to fit in memory twice
+    cl = np.lib.format.open_memmap(os.path.join(tensor_dir, "cl.npy"), mode="w+", dtype=np.float32, shape=shape)
+    cd = np.lib.format.open_memmap(os.path.join(tensor_dir, "cd.npy"), mode="w+", dtype=np.float32, shape=shape)
+    mask = np.lib.format.open_memmap(os.path.join(tensor_dir, "mask.npy"), mode="w+", dtype=np.bool_, shape=shape)
+    cl[:] = np.nan
+    cd[:] = np.nan
+    mask[:] = False
+
+    reynolds_slot = {value: slot for slot, value in enumerate(reynolds)}
+    for slot, airfoil in enumerate(airfoils):
+        for value, (start, stop) in database.index[airfoil]["reynolds"].items():
+            cell = (slot, reynolds_slot[int(value)])
+            cl[cell], mask[cell] = resample(alpha_column[start:stop], cl_column[start:stop], alpha)
+            cd[cell], _ = resample(alpha_column[start:stop], cd_column[start:stop], alpha)
+    # Stall points of every polar at once, with everything past them masked out
+    _, valid = stall_mask(np.asarray(cl), np.asarray(mask))
+    cl[~valid] = np.nan
+    cd[~valid] = np.nan
+    mask[:] = valid
+    for array in (cl, cd, mask):
+        array.flush()
+
+    with open(os.path.join(tensor_dir, INDEX_FILE), "w") as file:
+        json.dump({"store_hash": database.hash, "airfoils": airfoils, "reynolds": reynolds,
+                   "alpha": {"start": float(alpha[0]), "step": alpha_step, "count": count}}, file)
+    print("Built " + tensor_dir + ": " + " x ".join(str(size) for size in shape) + " (airfoil x Re x alpha)")
+
+
+class PolarTensor(PolarReader):
+    """A compiled tensor (see polarReader.PolarReader) with vectorised lookups over any number of points."""
+
+    def __init__(self, tensor_dir=DEFAULT_TENSOR):
+        super().__init__(tensor_dir)
+
+        # First and last alpha slot holding data in each (airfoil, Re) cell. Cells without data get 0 for both
+        # and stay NaN in lookups
+        has_data = self.mask.any(axis=2)
+        self.first_valid = np.where(has_data, self.mask.argmax(axis=2), 0)
+        self.last_valid = np.where(has_data, self.mask.shape[2] - 1 - self.mask[:, :, ::-1].argmax(axis=2), 0)
+        # Nearest Re slot at or below (prev_valid) and at or above (next_valid) each slot that has a polar for the
+        # airfoil, -1 where there is none
+        self.prev_valid = np.full(has_data.shape, -1, dtype=np.intp)
+        self.next_valid = np.full(has_data.shape, -1, dtype=np.intp)
+        for slot in range(has_data.shape[1]):
+            self.prev_valid[:, slot] = np.where(has_data[:, slot], slot, self.prev_valid[:, slot - 1] if slot else -1)
+        for slot in reversed(range(has_data.shape[1])):
+            last = has_data.shape[1] - 1
+            self.next_valid[:, slot] = np.where(has_data[:, slot], slot, self.next_valid[:, slot + 1] if slot < last else -1)
+
+    def airfoil_slots_of(self, airfoils):
+        """Slots of airfoils given by name (or already as slots), as an integer array."""
+        airfoils = np.asarray(airfoils)
+        if airfoils.dtype.kind in "iu":
+            return airfoils.astype(np.intp)
+        return np.vectorize(self.airfoil_slots.__getitem__, otypes=[np.intp])(airfoils)
+
+    def interpolate_alpha(self, array, airfoil, reynolds_slot, alpha, extrapolate):
+        # Grid position of each alpha, then linear interpolation between the two grid points either side of it,
+        # kept inside the cell's data (so past the ends the first or last segment is extended)
+        first = self.first_valid[airfoil, reynolds_slot]
+        last = self.last_valid[airfoil, reynolds_slot]
+        position = (alpha - self.alpha[0]) / self.alpha_step
+        if not extrapolate:
+            position = np.clip(position, first, last)
+        lo = np.clip(np.floor(position).astype(np.intp), first, np.maximum(last - 1, first))
+        hi = np.minimum(lo + 1, last)
+        y_lo = array[airfoil, reynolds_slot, lo].astype(np.float64)
+        y_hi = array[airfoil, reynolds_slot, hi].astype(np.float64)
+        return y_lo + (position - lo) * (y_hi - y_lo)
+
+    def lookup(self, airfoils, reynolds, alpha, mode="extrapolate"):
+        """CL and CD arrays at any number of (airfoil, Reynolds number, alpha) points in one call.
+
+        airfoils (names or slots), reynolds and alpha are broadcast against each other. Each airfoil's polars are
+        interpolated linearly in alpha, then blended linearly between the polars either side of the Reynolds number;
+        Reynolds numbers outside an airfoil's polars use the nearest one. Past the ends of a polar, mode
+        "extrapolate" extends its first or last segment (like aeroCoeffs.AeroCoeffProvider) and "clamp" holds the
+        end value. Points on an airfoil with no polars are NaN.
+        """
+        if mode not in ("extrapolate", "clamp"):
+            raise ValueError("mode must be 'extrapolate' or 'clamp'")
+        airfoil, reynolds, alpha = np.broadcast_arrays(self.airfoil_slots_of(airfoils), np.asarray(reynolds, dtype=np.float64),
+                                                       np.asarray(alpha, dtype=np.float64))
+        known = np.asarray(self.reynolds, dtype=np.float64)
+        count = len(known)
+
+        # Re slots either side, moved to the nearest slots this airfoil has a polar at
+        below = np.searchsorted(known, reynolds, side="right") - 1
+        above = np.searchsorted(known, reynolds, side="left")
+        lower = np.where(below >= 0, self.prev_valid[airfoil, np.clip(below, 0, count - 1)], -1)
+        upper = np.where(above < count, self.next_valid[airfoil, np.clip(above, 0, count - 1)], -1)
+        lower = np.where(lower < 0, upper, lower)
+        upper = np.where(upper < 0, lower, upper)
+        missing = lower < 0
+        lower = np.where(missing, 0, lower)
+        upper = np.where(missing, 0, upper)
+
+        spread = known[upper] - known[lower]
+        ratio = np.where(upper != lower, (reynolds - known[lower]) / np.where(spread == 0, 1, spread), 0.0)
+
+        extrapolate = mode == "extrapolate"
+        results = []
+        for array in (self.cl, self.cd):
+            at_lower = self.interpolate_alpha(array, airfoil, lower, alpha, extrapolate)
+            at_upper = self.interpolate_alpha(array, airfoil, upper, alpha, extrapolate)
+            results.append(np.where(missing, np.nan, at_lower + ratio * (at_upper - at_lower)))
+        return results[0], results[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the polar database into a dense CL / CD tensor")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--store", default=DEFAULT_STORE)
+    parser.add_argument("--tensor", default=DEFAULT_TENSOR)
+    parser.add_argument("--alpha-start", type=float, default=ALPHA_START)
+    parser.add_argument("--alpha-stop", type=float, default=ALPHA_STOP)
+    parser.add_argument("--alpha-step", type=float, default=ALPHA_STEP)
+    args = parser.parse_args()
+    build(args.store, args.tensor, args.alpha_start, args.alpha_stop, args.alpha_step)
@@ -0,0 +1,158 @@
+# Airfoil ranking over the polar database's metrics table (see polarMetrics.py)
+# Picks the best airfoils by one metric, only counting polars in a Reynolds number range that pass a filter:
+#   python rankAirfoils.py --metric ld_max --re 100000..200000 --where "cl0 < 0.05" --top 20
+#   python rankAirfoils.py --metric cd0 --lowest --across worst --where "symmetric == true and cl_max > 1"
+#   python rankAirfoils.py --metric cl_max --geometry "thickness >= 0.1 and reflexed == false"
+# The Reynolds number range, the --where filter and the --geometry filter (on the geometry table, see
+# airfoilGeometry.py) are pushed down into the parquet scans, and the ranking keeps only the current top airfoils in
+# a heap as the table streams past, so nothing is sorted in full.
+
+import argparse
+import heapq
+import math
+import os
+import re
+
+from airfoilGeometry import GEOMETRY_COLUMNS
+from polarDatabase import DEFAULT_STORE, GEOMETRY_FILE, METRICS_FILE, PolarDatabase
+from polarMetrics import METRIC_COLUMNS
+
+# How each airfoil's polars in the Reynolds number range are combined into its score
+ACROSS = ["best", "worst", "mean"]
+
+CLAUSE = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>|=)\s*(\S+)\s*$")
+
+
+# Function to parse a Reynolds number range: "100000..200000", "100000.." or "..200000", or a single value
+def parse_range(text):
+    if ".." not in text:
+        return int(float(text)), int(float(text))
+    low, high = text.split("..", 1)
+    return (int(float(low)) if low.strip() else None), (int(float(high)) if high.strip() else None)
+
+
+# Function to turn a --where filter ("cl0 < 0.05 and symmetric == true") into a pyarrow expression. Clauses
+# compare one of columns with a number (or true / false) and are joined by "and"
+def parse_where(text, columns=METRIC_COLUMNS):
+    import pyarrow.dataset as ds
+
+    expression = None
+    for clause in re.split(r"\s+and\s+", text.strip(), flags=re.IGNORECASE):
+        match = CLAUSE.match(clause)
+        if match is None:
+            raise ValueError("Can't read the filter '" + clause + "', expected e.g. cl0 < 0.05")
+        column, operator, value = match.groups()
+        if column not in columns:
+            raise ValueError("Unknown column '" + column + "', expected one of " + ", ".join(columns))
+        if value.lower() in ("true", "false"):
+            value = value.lower() == "true"
+        else:
+            value = float(value)
+        field = ds.field(column)
+        term = {"<": field < value, "<=": field <= value, ">": field > value, ">=": field >= value,
+                "=": field == value, "==": field == value, "!=": field != value}[operator]
+        expression = term if expression is None else expression & term
+    return expression
+
+
+# Function to get the airfoils whose geometry passes a filter ("thickness > 0.1"), from the geometry table
+def geometry_matches(store, geometry):
+    import pyarrow.dataset as ds
+
+    path = os.path.join(store, GEOMETRY_FILE)
+    if not os.path.exists(path):
+        raise ValueError("The store has no geometry table, ingest coordinates with airfoilGeometry.py first")
+    table = ds.dataset(path, format="parquet").to_table(columns=["Airfoil"],
+                                                        filter=parse_where(geometry, GEOMETRY_COLUMNS))
+    return table.column("Airfoil").to_pylist()
+
+
+# Function to stream (airfoil, Reynolds number, value) for every polar that passes the filters
+def scan(store, metric, reynolds=None, where=None, geometry=None, batch_size=4096):
+    import pyarrow.dataset as ds
+
+    path = os.path.join(store, METRICS_FILE)
+    if not os.path.exists(path):
+        PolarDatabase(store).metrics()
+    expression = parse_where(where) if where else None
+    if geometry:
+        term = ds.field("Airfoil").isin(geometry_matches(store, geometry))
+        expression = term if expression is None else expression & term
+    if reynolds is not None:
+        low, high = reynolds
+        field = ds.field("Reynold's Number")
+        for term in ([field >= low] if low is not None else []) + ([field <= high] if high is not None else []):
+            expression = term if expression is None else expression & term
+
+    scanner = ds.dataset(path, format="parquet").scanner(columns=["Airfoil", "Reynold's Number", metric],
+                                                         filter=expression, batch_size=batch_size)
+    for batch in scanner.to_batches():
+        columns = batch.to_pydict()
+        yield from zip(columns["Airfoil"], columns["Reynold's Number"], columns[metric])
+
+
+# Function to combine the polars of each airfoil into one score. The table is sorted by airfoil, so each
+# airfoil's polars arrive together and only one airfoil is held at a time
+def airfoil_scores(rows, across, lowest):
+    name, polars = None, []
+    for airfoil, reynolds, value in rows:
+        if value is None or math.isnan(value):
+            continue
+        if airfoil != name and polars:
+            yield score(name, polars, across, lowest)
+            polars = []
+        name = airfoil
+        polars.append((float(value), reynolds))
+    if polars:
+        yield score(name, polars, across, lowest)
+
+
+# Function to score one airfoil from its (value, Reynolds number) polars
+def score(airfoil, polars, across, lowest):
+    if across == "mean":
+        return {"airfoil": airfoil, "value": sum(value for value, _ in polars) / len(polars), "reynolds": None,
+                "polars": len(polars)}
+    # best is the end of the range the ranking prefers, worst the other end
+    pick = min if (across == "best") == lowest else max
+    value, reynolds = pick(polars)
+    return {"airfoil": airfoil, "value": value, "reynolds": reynolds, "polars": len(polars)}
+
+
+# Function to rank airfoils by a metric. Returns the top airfoils, best first, as dicts of airfoil, value,
+# reynolds (the polar the value came from, None for mean) and polars (how many polars passed the filters)
+def rank(metric="ld_max", reynolds=None, where=None, top=20, across="best", lowest=False, store=DEFAULT_STORE,
+         geometry=None):
+    if metric not in METRIC_COLUMNS or metric == "symmetric":
+        raise ValueError("Can't rank by '" + metric + "'")
+    if across not in ACROSS:
+        raise ValueError("across must be one of " + ", ".join(ACROSS))
+    scores = airfoil_scores(scan(store, metric, reynolds, where, geometry), across, lowest)
+    if lowest:
+        return heapq.nsmallest(top, scores, key=lambda entry: entry["value"])
+    return heapq.nlargest(top, scores, key=lambda entry: entry["value"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank airfoils by a polar metric")
+    parser.add_argument("--metric", default="ld_max", choices=[column for column in METRIC_COLUMNS if column != "symmetric"])
+    parser.add_argument("--re", default=None, help="Reynolds number range, e.g. 100000..200000")
+    parser.add_argument("--where", default=None, help="filter on metrics, e.g. \"cl0 < 0.05 and cl_max > 1.2\"")
+    parser.add_argument("--geometry", default=None,
+                        help="filter on airfoil geometry, e.g. \"thickness >= 0.1 and reflexed == false\"")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--across", choices=ACROSS, default="best",
+                        help="score each airfoil by its best, worst or mean polar in the range")
+    parser.add_argument("--lowest", action="store_true", help="rank the lowest values first (e.g. for cd0)")
+    parser.add_argument("--store", default=DEFAULT_STORE)
+    args = parser.parse_args()
+
+    try:
+        ranking = rank(args.metric, parse_range(args.re) if args.re else None, args.where, args.top, args.across,
+                       args.lowest, args.store, args.geometry)
+    except ValueError as error:
+        parser.error(str(error))
+
+    print("%4s  %-28s %12s %10s %7s" % ("rank", "airfoil", args.metric, "Re", "polars"))
+    for place, entry in enumerate(ranking, start=1):
+        print("%4d  %-28s %12.4f %10s %7d" % (place, entry["airfoil"], entry["value"],
+                                               "" if entry["reynolds"] is None else entry["reynolds"], entry["polars"]))
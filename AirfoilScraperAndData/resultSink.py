@@ -0,0 +1,110 @@
+# Buffered writer for scraper and calculator output
+# Rows are collected in memory and written in batches, when the batch is full or a few seconds have passed,
+# instead of opening and closing the output file for every row. Output can be csv or Parquet (one row group
+# per batch), picked from the file extension. checkpoint() forces everything written so far onto the disk.
+# Given the hashes of the datasets the rows came from, closing also records them next to the output (see
+# datasetVersion.py), so the next run can tell whether the output is still up to date.
+
+import csv
+import os
+import time
+
+
+class ResultSink:
+    """Batching row writer. header is the list of column names, batch_rows and flush_seconds are the size and age
+    at which buffered rows are written. For Parquet output, types optionally maps column names to Arrow type names
+    (e.g. {"CL": "float64"}) for columns that should not keep the type inferred from the rows. inputs ({name: dataset
+    hash}) and parameters are recorded with datasetVersion.write_meta when the sink is closed."""
+
+    def __init__(self, path, header, batch_rows=5000, flush_seconds=5.0, types=None, file_format=None, inputs=None,
+                 parameters=None):
+        self.path = path
+        self.inputs = inputs
+        self.parameters = parameters
+        self.header = list(header)
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.types = types or {}
+        self.file_format = file_format or ("parquet" if path.endswith(".parquet") else "csv")
+        self.buffer = []
+        self.rows_written = 0
+        self.last_flush = time.monotonic()
+        if self.file_format == "parquet":
+            self.file = open(path, "wb")
+            self.writer = None  # made when the first batch arrives, so its schema can be inferred
+        else:
+            self.file = open(path, mode="w", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(self.header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is not None:
+            self.inputs = None  # Output cut short by an error is not recorded as up to date
+        self.close()
+
+    def write(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= self.batch_rows or time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        """Write the buffered rows to the file."""
+        if self.buffer:
+            if self.file_format == "parquet":
+                self.write_row_group(self.buffer)
+            else:
+                self.writer.writerows(self.buffer)
+            self.rows_written += len(self.buffer)
+            self.buffer = []
+        self.file.flush()
+        self.last_flush = time.monotonic()
+
+    def write_table(self, table):
+        """Write an Arrow table with the sink's columns as its own row group (Parquet only), after any buffered rows.
+        For output that is already columnar, e.g. a parsed file, so it is not split into rows and back."""
+        self.flush()
+        self.write_row_group(table)
+        self.rows_written += table.num_rows
+
+    def write_row_group(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if isinstance(rows, pa.Table):
+            table = rows.select(self.header)
+        else:
+            table = pa.table({name: [row[i] for row in rows] for i, name in enumerate(self.header)})
+        if self.writer is None:
+            schema = pa.schema([(field.name, pa.type_for_alias(self.types[field.name]) if field.name in self.types
+                                 else field.type) for field in table.schema])
+            self.writer = pq.ParquetWriter(self.file, schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def checkpoint(self):
+        """Flush and fsync, so everything written so far survives a crash."""
+        self.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        if self.file_format == "parquet":
+            # A Parquet file is only readable once its footer is written, even if no rows ever arrived
+            if self.writer is None:
+                self.write_row_group([])
+            self.writer.close()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        if self.inputs is not None:
+            from datasetVersion import write_meta
+
+            write_meta(self.path, self.inputs, self.parameters)
@@ -0,0 +1,109 @@
+# Throughput benchmark for the multi Reynolds number scraper
+# Starts a local mockAirfoilServer and runs AirfoilScrapeMultipleReynoldsAoA.py against it once per scraper mode,
+# each in a fresh directory, and reports polars per second alongside the request counts from the run report.
+#   python scraperBenchmark.py --pages 5 --latency 0.05 --rate 50
+# Nothing here touches the real site.
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from mockAirfoilServer import MockSite, make_server, serve_in_thread
+
+SCRAPER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "AirfoilScrapeMultipleReynoldsAoA.py")
+
+# name, scraper options, and the mode whose directory (cache, manifest and output) the run starts from
+MODES = [
+    ("walk", [], None),
+    ("walk, inline parsing", ["--parse-workers", "0"], None),
+    ("direct", ["--direct"], None),
+    ("direct, offline replay", ["--direct", "--offline"], "direct"),
+    ("direct, delta with no changes", ["--direct", "--delta", "previous.csv"], "direct"),
+]
+
+
+# Function to count the polars in a scraper output csv (one per distinct data url)
+def count_polars(path):
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+        next(reader)
+        return len({row[1] for row in reader})
+
+
+# Function to run the scraper in one mode and return its results. Each mode starts its own manifest, so a mode that
+# starts from another's directory only reuses its cache and output
+def run_mode(name, options, workdir, site, scraper_options):
+    command = [sys.executable, SCRAPER, "--site", site, "--cache-dir", os.path.join(workdir, "cache"),
+               "--manifest", os.path.join(workdir, "manifest-" + os.path.basename(workdir) + ".sqlite"), "--output", os.path.join(workdir, "output.csv"),
+               "--report", os.path.join(workdir, "report.json")] + scraper_options + options
+    start = time.perf_counter()
+    subprocess.run(command, cwd=workdir, check=True, stdout=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+
+    with open(os.path.join(workdir, "report.json")) as file:
+        report = json.load(file)
+    polars = count_polars(os.path.join(workdir, "output.csv"))
+    return {"mode": name, "seconds": round(elapsed, 3), "polars": polars, "polars_per_second": round(polars / elapsed, 2),
+            "requests": report["requests"]["count"], "requests_per_second": round(report["requests"]["per_second"], 2),
+            "cache_hits": report["requests"]["cache_hits"], "kilobytes": round(report["requests"]["bytes"] / 1000, 1),
+            "errors": sum(error["count"] for error in report["errors"])}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the scraper's polars per second against a local stand-in site")
+    parser.add_argument("--pages", type=int, default=3, help="search pages of synthetic airfoils")
+    parser.add_argument("--per-page", type=int, default=10)
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="fraction of polars with no csv")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the server adds to every request")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 503")
+    parser.add_argument("--rate", type=float, default=50.0, help="scraper requests per second")
+    parser.add_argument("--workers", type=int, default=8, help="scraper units of work at once")
+    parser.add_argument("--per-host", type=int, default=4, help="scraper requests open at once")
+    parser.add_argument("--modes", nargs="+", default=None, help="only run these modes (by name)")
+    parser.add_argument("--output", default=None, help="also write the results to this csv")
+    args = parser.parse_args()
+
+    server = make_server(port=0, site=MockSite(args.pages, args.per_page, args.missing_rate), latency=args.latency,
+                         jitter=args.jitter, error_rate=args.error_rate)
+    serve_in_thread(server)
+    site = "http://127.0.0.1:" + str(server.server_port)
+    scraper_options = ["--rate", str(args.rate), "--workers", str(args.workers), "--per-host", str(args.per_host)]
+
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        for name, options, start_from in MODES:
+            if args.modes is not None and name not in args.modes:
+                continue
+            workdir = os.path.join(root, name.replace(",", "").replace(" ", "_"))
+            if start_from is not None:
+                previous = os.path.join(root, start_from)
+                if not os.path.isdir(previous):
+                    print("Skipping " + name + ", it needs the " + start_from + " mode to run first")
+                    continue
+                # Start from a copy of the earlier run's cache and output
+                shutil.copytree(previous, workdir)
+                os.replace(os.path.join(workdir, "output.csv"), os.path.join(workdir, "previous.csv"))
+            else:
+                os.makedirs(workdir)
+            results.append(run_mode(name, options, workdir, site, scraper_options))
+            print(results[-1])
+    server.shutdown()
+
+    print()
+    print("%-32s %8s %8s %10s %9s %8s %7s" % ("mode", "seconds", "polars", "polars/s", "requests", "cached", "errors"))
+    for result in results:
+        print("%-32s %8.2f %8d %10.2f %9d %8d %7d" % (result["mode"], result["seconds"], result["polars"],
+                                                      result["polars_per_second"], result["requests"],
+                                                      result["cache_hits"], result["errors"]))
+    if args.output and results:
+        with open(args.output, mode="w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
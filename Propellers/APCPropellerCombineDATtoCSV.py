@@ -2,81 +2,56 @@
 #Created by Aaron Hess
 
 
+import argparse
 import os
 import csv
-from ast import parse
 
-import pandas as pd
+from datParser import parse_dat_text, read_header
 
-import re
-
-def remove_non_numeric(string):
-  return re.sub(r'[^0-9.]', '', string)
+# Columns of the .dat blocks written for each row, after diameter, pitch and rpm
+BLOCK_COLUMNS = ['V', 'J', 'Reyn', 'Thrust', 'Torque', 'PWR_W']
 
 
 def parse_dat_file(file_path):
-    rpm_data = {}
-    current_rpm = None
-    data_block = []
-
+    """Reads one .dat file into {rpm: rows}, each row diameter, pitch, rpm and then BLOCK_COLUMNS.
+    Propellers over 12 inches are skipped (an empty dict)."""
     with open(file_path, 'r') as file:
-        for line in file:
-            if '.dat' in line:
-                diameter = line.split()[0].split('x')[0]
-                pitch = remove_non_numeric(line.split()[0].split('x')[1])
-            if float(diameter) > 12:
-                return rpm_data
-            if "PROP RPM" in line:
-                if current_rpm is not None and data_block:
-                    rpm_data[current_rpm] = data_block  # Store raw data block without headers
-                current_rpm = int(line.split('=')[-1].strip())
-                data_block = []
-            elif line.strip() and current_rpm is not None:
-                values = line.split()
-                if len(values) >= 8:
-                    try:
-                        velocity = float(values[0])
-                        thrust = float(values[7])
-                        power = float(values[8])
-                        torque = float(values[6])
-                        advRatio = float(values[1])
-                        Reynolds = float(values[13])
-                        data_block.append([diameter, pitch, current_rpm, velocity, advRatio, Reynolds, thrust, torque, power])
-                    except ValueError:
-                        continue
-
-    if current_rpm is not None and data_block:
-        rpm_data[current_rpm] = data_block  # Store raw data block without headers
+        text = file.read()
+    header = read_header(text)
+    if header['diameter'] is None or header['diameter'] > 12:
+        return {}
+    diameter, pitch = '%g' % header['diameter'], '%g' % header['pitch']
 
+    rpm_data = {}
+    for rpm, block in parse_dat_text(text).items():
+        rpm_data[rpm] = [[diameter, pitch, rpm, *row] for row in block[BLOCK_COLUMNS].tolist()]
     return rpm_data
 
 
 def process_folder(input_folder, output_csv):
-    """Processes all data files in the input folder and writes to an output CSV."""
-    all_data = []
-    for filename in os.listdir(input_folder):
-        if filename.endswith('.dat'):  # Only process .dat files
-            filepath = os.path.join(input_folder, filename)
-            file_data = parse_dat_file(filepath)
-
-            # Flatten data: Extract rows from each RPM's data block
-            for rpm, data_block in file_data.items():
-                all_data.extend(data_block)
-
-    # Write the collected data to a CSV file
+    """Processes all data files in the input folder and writes to an output CSV, one file at a time, so only one
+    file's rows are ever held in memory. (propIngest.py does the same in parallel, into Parquet.)"""
     with open(output_csv, 'w', newline='') as csvfile:
         csv_writer = csv.writer(csvfile)
         # Write header
         csv_writer.writerow(['diameter', 'pitch', 'rpm', 'velocity', 'advance_ratio', 'reynolds_number', 'thrust', 'torque', 'power (W)'])
-        # Write all rows
-        csv_writer.writerows(all_data)
+        for filename in sorted(os.listdir(input_folder)):
+            if filename.endswith('.dat'):  # Only process .dat files
+                file_data = parse_dat_file(os.path.join(input_folder, filename))
+
+                # Flatten data: Write the rows of each RPM's data block
+                for rpm, data_block in file_data.items():
+                    csv_writer.writerows(data_block)
 
     print(f"Data has been written to {output_csv}")
 
 
-# Specify the folder containing data files and the output CSV file
-input_folder = 'C:\\Users\\aug30\\Downloads\\PERFILES_WEB-202410\\PERFILES_WEB\\PERFILES2'  # Replace with the actual folder path
-output_csv = 'all_props_12_and_under_data.csv'
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Combine a folder of APC .dat files into one csv')
+    # The folder containing data files, e.g. PERFILES_WEB/PERFILES2 from APC's download, and the output CSV file
+    parser.add_argument('input_folder')
+    parser.add_argument('output_csv', nargs='?', default='all_props_12_and_under_data.csv')
+    args = parser.parse_args()
 
-# Run the processing function
-process_folder(input_folder, output_csv)
+    # Run the processing function
+    process_folder(args.input_folder, args.output_csv)
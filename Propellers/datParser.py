@@ -0,0 +1,160 @@
+# Shared parser for APC PER3 performance files (PER3_<prop>.dat, from APC's PERFILES download)
+# A file is a header naming the propeller ("5x4.5E  (5x45E.dat)") followed by one block per RPM:
+#   PROP RPM =       1000
+#   V  J  Pe  Ct  Cp  PWR  Torque  Thrust  PWR  Torque  Thrust  THR/PWR  Mach  Reyn  FOM    (column names)
+#   (mph)  (Adv_Ratio)  ...                                                                   (units)
+#   rows of 15 numbers
+# The blocks are found by searching the whole file, and the numbers of all blocks are converted together by array
+# operations on the file's fixed width layout, rather than the file being split and converted line by line.
+
+import re
+
+import numpy as np
+
+# The 15 columns of a block, in file order. Where the file gives a quantity twice, the imperial one (the one the
+# scripts have always used) keeps the plain name
+COLUMNS = ["V", "J", "Pe", "Ct", "Cp", "PWR", "Torque", "Thrust", "PWR_W", "Torque_Nm", "Thrust_N", "THR_PWR",
+           "Mach", "Reyn", "FOM"]
+UNITS = ["mph", "-", "-", "-", "-", "hp", "in-lbf", "lbf", "W", "N-m", "N", "g/W", "-", "-", "-"]
+DTYPE = np.dtype([(name, np.float64) for name in COLUMNS])
+
+RPM_LINE = re.compile(r"PROP RPM\s*=\s*(\d+)")
+PROP_NAME = re.compile(r"^\s*(\S+)\s+\((\S+\.dat)\)", re.MULTILINE)
+PROP_SIZE = re.compile(r"([\d.]+)x([\d.]+)([A-Za-z]*)")
+
+
+# Function to split a propeller name into its diameter and pitch (inches) and its family, the letters APC puts after
+# the size ("10x7SF" -> 10.0, 7.0, "SF"; "5x4.5E" -> 5.0, 4.5, "E"). All None if the name does not start with a size
+def prop_size(name):
+    size = PROP_SIZE.match(name or "")
+    if size is None:
+        return None, None, None
+    return float(size.group(1)), float(size.group(2).rstrip(".")), size.group(3).upper()
+
+
+# Function to read the propeller's name, diameter, pitch and family from the top of a file (see prop_size)
+def read_header(text):
+    match = PROP_NAME.search(text)
+    name = match.group(1) if match else None
+    diameter, pitch, family = prop_size(name)
+    return {"name": name, "file": match.group(2) if match else None, "diameter": diameter, "pitch": pitch,
+            "family": family}
+
+
+# Function to convert the rows of one block the slow way, a line at a time, keeping only complete rows that are all
+# numbers. Used for the odd file that is not in APC's fixed width layout
+def line_rows(text):
+    rows = []
+    for line in text.splitlines():
+        values = line.split()
+        if len(values) != len(COLUMNS):
+            continue
+        try:
+            rows.append([float(value) for value in values])
+        except ValueError:
+            continue
+    return np.array(rows, dtype=np.float64).reshape(-1, len(COLUMNS))
+
+
+# Function to find the rows of every RPM block, as (RPM, start, end) positions in the text: from the line after the
+# units line to the next block's RPM line (or the end of the file)
+def block_sections(text):
+    starts = [match.start() for match in re.finditer("PROP RPM", text)] + [len(text)]
+    sections = []
+    for start, end in zip(starts, starts[1:]):
+        rpm = RPM_LINE.match(text, start)
+        units = text.find("(mph)", start, end)
+        rows = text.find("\n", units, end) + 1
+        if rpm is not None and units >= 0 and rows > 0:
+            sections.append((int(rpm.group(1)), rows, end))
+    return sections
+
+
+# Function to find the layout of a file's rows from its first one: the width of a line (with its newline) and where
+# each number ends. None if the lines are not all the same width or the row does not hold 15 numbers
+def row_layout(text, first_row):
+    width = text.find("\n") + 1
+    ends = [match.end() for match in re.finditer(r"\S+", text[first_row:first_row + width - 1])]
+    if width == 0 or len(text) % width not in (0, width - 1) or text[width - 1::width].strip("\n") \
+            or len(ends) != len(COLUMNS):
+        return None
+    return width, np.array(ends)
+
+
+# Function to convert the rows of every block at once, using the fixed point, fixed width layout APC writes the
+# files in: every line padded to the same length, and every number right aligned in its column with its point in the
+# same place in every row. The text is viewed as an array of (line, character) and its digits turned into numbers
+# with one matrix product, each character's digit times its place value (10 ** the digits to its right). Dividing
+# by the column's power of ten then rounds exactly like float() of the text. Returns the rows of all sections as one
+# (n, 15) array and where each section's rows start and end in it, or None if the file is not laid out like this
+def fixed_width_rows(text, sections):
+    layout = row_layout(text, sections[0][1]) if sections else None
+    if layout is None:
+        return None
+    width, ends = layout
+    chars = np.frombuffer(text.encode("ascii", "replace"), dtype=np.uint8)
+    grid = chars[:len(chars) // width * width].reshape(-1, width)
+    lines = [np.arange(start // width, end // width) for _, start, end in sections]
+    rows = grid[np.concatenate(lines)][:, :ends[-1]]
+    # A row is read if it has all 15 numbers (APC ends some blocks with a row of just V and J, and between blocks
+    # there are blank lines)
+    complete = (rows[:, ends - 1] != 32).all(axis=1)
+    rows = rows[complete]
+    block = np.repeat(np.arange(len(sections)), [len(block_lines) for block_lines in lines])[complete]
+    bounds = np.cumsum([0] + list(np.bincount(block, minlength=len(sections))))
+    if not len(rows):
+        return np.empty((0, len(COLUMNS))), bounds
+
+    # The layout of the first row: which number each character belongs to, where the points are, and so how many
+    # digits are to the right of each character and after each number's point
+    position = np.arange(ends[-1])
+    column = np.searchsorted(ends, position, side="right")
+    point = rows[0] == 46
+    point_at = ends.copy()
+    point_at[column[point]] = position[point]
+    after = ends[column] - 1 - position - (point_at[column] > position)
+    place = np.where((column[:, None] == np.arange(len(COLUMNS))) & ~point[:, None],
+                     10.0 ** np.maximum(after, 0)[:, None], 0)
+    decimals = np.where(point_at < ends, ends - 1 - point_at, 0)
+
+    # Every row must have the same layout: only digits, points, minus signs and spaces, the points in the same
+    # places, no gaps inside a number, and a minus sign only at the start of one
+    digits = rows - np.uint8(48)
+    digit = digits < 10
+    space = rows == 32
+    same_number = column[1:] == column[:-1]
+    minus = np.flatnonzero(rows == 45)
+    minus_row, minus_at = np.divmod(minus, ends[-1])
+    if ((~digit & ~space & (rows != 45) & (rows != 46)).any() or ((rows == 46) != point).any()
+            or (space[:, 1:] & ~space[:, :-1] & same_number).any()
+            or (minus_at + 1 >= ends[column[minus_at]]).any() or space.ravel()[minus + 1].any()
+            or ((minus_at > 0) & same_number[minus_at - 1] & ~space.ravel()[minus - 1]).any()):
+        return None
+
+    digits *= digit
+    values = (digits.astype(np.float64) @ place) / 10.0 ** decimals
+    values[minus_row, column[minus_at]] *= -1
+    return values, bounds
+
+
+# Function to parse the text of a PER3 file into {RPM: structured array}, with one float64 field per column, so
+# block["V"] and block["Thrust"] are the speed and thrust arrays of that RPM. A file the fixed width reading can't
+# take is read line by line instead
+def parse_dat_text(text):
+    sections = block_sections(text)
+    parsed = fixed_width_rows(text, sections)
+    if parsed is None:
+        rows = [line_rows(text[start:end]) for _, start, end in sections]
+        values = np.concatenate(rows) if rows else np.empty((0, len(COLUMNS)))
+        bounds = np.cumsum([0] + [len(block) for block in rows])
+    else:
+        values, bounds = parsed
+    table = np.ascontiguousarray(values).view(DTYPE).reshape(-1)
+    return {rpm: table[bounds[number]:bounds[number + 1]] for number, (rpm, _, _) in enumerate(sections)
+            if bounds[number + 1] > bounds[number]}
+
+
+# Function to parse a PER3 .dat file into {RPM: structured array} (see parse_dat_text)
+def parse_dat_file(file_path):
+    with open(file_path, "r") as file:
+        return parse_dat_text(file.read())
@@ -0,0 +1,259 @@
+# Propeller performance database built from the ingested .dat rows (see propIngest.py)
+# Every prop is kept as dense (RPM, point) grids, one row per RPM block of its .dat file and one column per point of
+# the block (APC gives 29 or 30 speeds per RPM, padding is NaN), so a prop's data is a set of array slices rather than
+# long rows to regroup. In prop_store/grids/:
+#   rpm.npy, points.npy     - the RPM of every block and how many points it has
+#   V.npy, J.npy, Thrust.npy, Torque.npy, PWR_W.npy, Ct.npy, Cp.npy - (block, point) grids, opened memory mapped
+#   thrust_fit.npy          - the quadratic thrust curve of every block, a * V^2 + b * V + c, with its RMS and largest
+#                             residual and R^2 (see propFit.py), all blocks fitted together when the grids are built
+#   index.json              - every prop's diameter, pitch, family (E, MR, SF, ...) and row range of blocks, sorted
+#                             by diameter then pitch, and the hash of the ingest manifest the grids were built from
+# Units are APC's: V in mph, thrust in lbf, torque in in-lbf, power in W.
+#   python propDatabase.py build
+#   python propDatabase.py query --diameter 10..14 --pitch 6..8 --family E
+#   python propDatabase.py show 5x4.5E
+#   python propDatabase.py curve 5x4.5E --rpm 24000     (the thrust_curve list for the takeoff scripts)
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'AirfoilScraperAndData'))
+from datasetVersion import combined_hash
+from propFit import coefficients, fit_quadratics
+from propIngest import DEFAULT_STORE, PROP_DIR, ROWS_DIR, ingest, read_manifest
+
+GRID_DIR = "grids"
+INDEX_FILE = "index.json"
+
+GRID_COLUMNS = ["V", "J", "Thrust", "Torque", "PWR_W", "Ct", "Cp"]
+FIT_FILE = "thrust_fit.npy"
+
+
+# Function to get the hash a store's grids are built from: the content hashes of every ingested file
+def manifest_hash(manifest):
+    return combined_hash({name: entry["hash"] or "" for name, entry in manifest["files"].items()})
+
+
+# Function to parse a range of values: "10..14", "10.." or "..14", or a single value
+def parse_range(text):
+    if ".." not in text:
+        return float(text), float(text)
+    low, high = text.split("..", 1)
+    return (float(low) if low.strip() else None), (float(high) if high.strip() else None)
+
+
+# Function to build the grids of a store from its ingested rows. Each prop's file is read once from the part that
+# holds it, a row group at a time (a row group always holds whole files): the first pass finds every block and its
+# length, the second writes the points straight into the memory mapped grids. A prop ingested from two files keeps
+# the first one's data
+def build(store=DEFAULT_STORE):
+    import pyarrow.parquet as pq
+
+    manifest = read_manifest(store)
+    files, seen = {}, set()
+    for name, entry in sorted(manifest["files"].items()):
+        if entry.get("part") and entry.get("prop") not in seen:
+            files[name] = entry
+            seen.add(entry.get("prop"))
+    if not files:
+        raise ValueError("No propeller rows in " + store + ", ingest a folder of .dat files with propIngest.py first")
+
+    # First pass: the blocks of every file, from the file and rpm columns only
+    blocks = {}
+    groups = []
+    for part in sorted({entry["part"] for entry in files.values()}):
+        source = pq.ParquetFile(os.path.join(store, ROWS_DIR, part))
+        for group in range(source.num_row_groups):
+            table = source.read_row_group(group, columns=["file", "rpm"])
+            file_column = table.column("file").to_numpy(zero_copy_only=False)
+            rpm = table.column("rpm").to_numpy()
+            starts = np.flatnonzero(np.concatenate(([True], (file_column[1:] != file_column[:-1])
+                                                    | (rpm[1:] != rpm[:-1]))))
+            lengths = np.diff(np.append(starts, len(rpm)))
+            for start, length in zip(starts, lengths):
+                if file_column[start] in files:
+                    blocks.setdefault(file_column[start], []).append((int(rpm[start]), int(length)))
+            groups.append((part, group, starts, lengths))
+
+    # Props in diameter then pitch order, each prop's blocks in RPM order
+    def order(name):
+        entry = files[name]
+        return (np.inf if entry["diameter"] is None else entry["diameter"],
+                np.inf if entry["pitch"] is None else entry["pitch"], entry["prop"])
+
+    props = sorted(files, key=order)
+    slots, index, rpms, points = {}, [], [], []
+    for name in props:
+        entry = files[name]
+        first = len(rpms)
+        for rpm, length in sorted(blocks.get(name, [])):
+            slots[(name, rpm)] = len(rpms)
+            rpms.append(rpm)
+            points.append(length)
+        index.append({"prop": entry["prop"], "file": name, "diameter": entry["diameter"], "pitch": entry["pitch"],
+                      "family": entry.get("family") or "", "blocks": [first, len(rpms)]})
+
+    grid_dir = os.path.join(store, GRID_DIR)
+    os.makedirs(grid_dir, exist_ok=True)
+    shape = (len(rpms), max(points))
+    np.save(os.path.join(grid_dir, "rpm.npy"), np.array(rpms, dtype=np.int64))
+    np.save(os.path.join(grid_dir, "points.npy"), np.array(points, dtype=np.int64))
+    grids = {}
+    for column in GRID_COLUMNS:
+        grids[column] = np.lib.format.open_memmap(os.path.join(grid_dir, column + ".npy"), mode="w+",
+                                                  dtype=np.float64, shape=shape)
+        grids[column][:] = np.nan
+
+    # Second pass: every row to its (block, point) cell
+    for part, group, starts, lengths in groups:
+        source = pq.ParquetFile(os.path.join(store, ROWS_DIR, part))
+        table = source.read_row_group(group, columns=["file", "rpm"] + GRID_COLUMNS)
+        file_column = table.column("file").to_numpy(zero_copy_only=False)
+        rpm = table.column("rpm").to_numpy()
+        destination = np.array([slots.get((file_column[start], int(rpm[start])), -1) for start in starts])
+        row_block = np.repeat(destination, lengths)
+        row_point = np.arange(len(rpm)) - np.repeat(starts, lengths)
+        keep = row_block >= 0
+        for column in GRID_COLUMNS:
+            grids[column][row_block[keep], row_point[keep]] = table.column(column).to_numpy()[keep]
+    for grid in grids.values():
+        grid.flush()
+    np.save(os.path.join(grid_dir, FIT_FILE), fit_quadratics(grids["V"], grids["Thrust"], np.array(points)))
+
+    with open(os.path.join(grid_dir, INDEX_FILE), "w") as file:
+        json.dump({"manifest_hash": manifest_hash(manifest), "columns": GRID_COLUMNS, "props": index}, file)
+    print("Built " + grid_dir + ": " + str(len(index)) + " props, " + str(shape[0]) + " RPM blocks of up to "
+          + str(shape[1]) + " points")
+
+
+class PropDatabase:
+    """Read access to a store's prop grids, with the metadata of every prop as arrays for range queries. The
+    default store ingests the .dat files next to this file the first time it is needed, and its grids are rebuilt
+    whenever the ingested files change."""
+
+    def __init__(self, store=DEFAULT_STORE):
+        self.store = store
+        grid_dir = os.path.join(store, GRID_DIR)
+        if os.path.abspath(store) == DEFAULT_STORE and not read_manifest(store)["files"]:
+            ingest(PROP_DIR, store)
+        index = None
+        if os.path.exists(os.path.join(grid_dir, INDEX_FILE)):
+            with open(os.path.join(grid_dir, INDEX_FILE)) as file:
+                index = json.load(file)
+        if index is None or index["manifest_hash"] != manifest_hash(read_manifest(store)) \
+                or not os.path.exists(os.path.join(grid_dir, FIT_FILE)):
+            build(store)
+            with open(os.path.join(grid_dir, INDEX_FILE)) as file:
+                index = json.load(file)
+        self.index = index["props"]
+        self.slots = {entry["prop"]: slot for slot, entry in enumerate(self.index)}
+        # Sorted by diameter then pitch when built, so a diameter range is a slice found by bisection
+        self.diameter = np.array([np.nan if entry["diameter"] is None else entry["diameter"] for entry in self.index])
+        self.pitch = np.array([np.nan if entry["pitch"] is None else entry["pitch"] for entry in self.index])
+        self.family = np.array([entry["family"] for entry in self.index], dtype=str)
+        self.rpm = np.load(os.path.join(grid_dir, "rpm.npy"))
+        self.points = np.load(os.path.join(grid_dir, "points.npy"))
+        self.grids = {column: np.load(os.path.join(grid_dir, column + ".npy"), mmap_mode="r")
+                      for column in index["columns"]}
+        self.fits = np.load(os.path.join(grid_dir, FIT_FILE))
+
+    def props(self):
+        """Every prop name, in diameter then pitch order."""
+        return [entry["prop"] for entry in self.index]
+
+    def query(self, diameter=None, pitch=None, family=None):
+        """Props with diameter and pitch in ranges ((low, high), either end None for open, inclusive) and in a family
+        (a name like "E" or a list of them), in diameter then pitch order."""
+        low, high = diameter if diameter is not None else (None, None)
+        first = np.searchsorted(self.diameter, low, side="left") if low is not None else 0
+        last = np.searchsorted(self.diameter, high, side="right") if high is not None else len(self.index)
+        keep = np.ones(max(last - first, 0), dtype=bool)
+        if pitch is not None:
+            pitches = self.pitch[first:last]
+            if pitch[0] is not None:
+                keep &= pitches >= pitch[0]
+            if pitch[1] is not None:
+                keep &= pitches <= pitch[1]
+        if family is not None:
+            keep &= np.isin(self.family[first:last], [family] if isinstance(family, str) else list(family))
+        return [self.index[slot]["prop"] for slot in first + np.flatnonzero(keep)]
+
+    def info(self, prop):
+        """A prop's file, diameter, pitch, family and RPMs. Raises KeyError for a prop the store does not have."""
+        entry = self.index[self.slots[prop]]
+        first, last = entry["blocks"]
+        return dict(entry, rpm=self.rpm[first:last].tolist())
+
+    def grid(self, prop):
+        """A prop's data as {"rpm": (n,) array, "points": (n,) array, column: (n, point) grid, ...}, one row per RPM
+        in increasing order, NaN past each row's points. The grids are read only views of the memory maps."""
+        first, last = self.index[self.slots[prop]]["blocks"]
+        grid = {"rpm": self.rpm[first:last], "points": self.points[first:last]}
+        grid.update({column: values[first:last] for column, values in self.grids.items()})
+        return grid
+
+    def thrust_fits(self, prop):
+        """A prop's quadratic thrust curves, one per RPM in increasing order, as {"rpm": (n,) array, "a", "b", "c",
+        "rmse", "max_error", "r2": (n,) arrays} (see propFit.fit_quadratics)."""
+        first, last = self.index[self.slots[prop]]["blocks"]
+        fits = {"rpm": self.rpm[first:last]}
+        fits.update({name: self.fits[name][first:last] for name in self.fits.dtype.names})
+        return fits
+
+    def thrust_curve(self, prop, rpm):
+        """The [a, b, c] thrust curve (lbf against mph) of a prop at the RPM of its data nearest rpm, the list the
+        takeoff scripts take as thrust_curve, and that RPM."""
+        first, last = self.index[self.slots[prop]]["blocks"]
+        block = first + int(np.argmin(np.abs(self.rpm[first:last] - rpm)))
+        return coefficients(self.fits[block]).tolist(), int(self.rpm[block])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Propeller performance database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="build the grids from the ingested rows")
+    build_parser.add_argument("--store", default=DEFAULT_STORE)
+    query_parser = commands.add_parser("query", help="list the props in diameter and pitch ranges")
+    query_parser.add_argument("--diameter", default=None, help="inches, e.g. 10..14")
+    query_parser.add_argument("--pitch", default=None, help="inches, e.g. 6..8")
+    query_parser.add_argument("--family", default=None, help="e.g. E, or E,SF")
+    query_parser.add_argument("--store", default=DEFAULT_STORE)
+    show_parser = commands.add_parser("show", help="print a prop's RPMs and static thrust")
+    show_parser.add_argument("prop")
+    show_parser.add_argument("--store", default=DEFAULT_STORE)
+    curve_parser = commands.add_parser("curve", help="print a prop's thrust curve at an RPM")
+    curve_parser.add_argument("prop")
+    curve_parser.add_argument("--rpm", type=float, required=True, help="the nearest RPM of the data is used")
+    curve_parser.add_argument("--store", default=DEFAULT_STORE)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.store)
+    elif args.command == "query":
+        database = PropDatabase(args.store)
+        props = database.query(parse_range(args.diameter) if args.diameter else None,
+                               parse_range(args.pitch) if args.pitch else None,
+                               args.family.upper().split(",") if args.family else None)
+        print("%-16s %8s %6s %-6s %5s" % ("prop", "diameter", "pitch", "family", "rpms"))
+        for prop in props:
+            info = database.info(prop)
+            print("%-16s %8g %6g %-6s %5d" % (prop, info["diameter"], info["pitch"], info["family"], len(info["rpm"])))
+    elif args.command == "show":
+        database = PropDatabase(args.store)
+        grid = database.grid(args.prop)
+        fits = database.thrust_fits(args.prop)
+        print(json.dumps({key: value for key, value in database.info(args.prop).items() if key != "rpm"}))
+        print("%8s %8s %12s %13s %13s %13s %8s" % ("rpm", "points", "thrust at 0", "a", "b", "c", "r2"))
+        for row, rpm in enumerate(grid["rpm"]):
+            print("%8d %8d %12.3f %13.6e %13.6e %13.6e %8.5f" % (rpm, grid["points"][row], grid["Thrust"][row, 0],
+                                                                 fits["a"][row], fits["b"][row], fits["c"][row],
+                                                                 fits["r2"][row]))
+    else:
+        database = PropDatabase(args.store)
+        curve, rpm = database.thrust_curve(args.prop, args.rpm)
+        print("Thrust curve of " + args.prop + " at " + str(rpm) + " RPM (lbf, V in mph):")
+        print("thrust_curve = [%.8e, %.8e, %.8e]" % tuple(curve))
@@ -0,0 +1,62 @@
+# Quadratic thrust curves, thrust = a * V^2 + b * V + c, fitted to every RPM block of every prop at once
+# A quadratic is linear in a, b and c, so the fit of a block is a linear least squares problem with a closed form
+# solution. All blocks are stacked as (block, point, 3) design matrices (rows past a block's points are zero, so they
+# add nothing to its fit) and solved together with one batched QR factorisation, instead of one iterative curve_fit
+# per block. Each block's speeds are scaled to [-1, 1] before the solve to keep it well conditioned. Every fit comes
+# with its residual statistics:
+#   fits = fit_quadratics(grid["V"], grid["Thrust"], grid["points"])   (see propDatabase.PropDatabase.grid)
+#   fits["a"], fits["b"], fits["c"], fits["rmse"], fits["r2"]           one value per block
+# propDatabase.py stores the fits of every prop next to its grids.
+
+import numpy as np
+
+FIT_COLUMNS = ["a", "b", "c", "rmse", "r2", "max_error"]
+FIT_DTYPE = np.dtype([(name, np.float64) for name in FIT_COLUMNS])
+
+
+# Function to fit a quadratic in velocity to values for every block of (block, point) grids, NaN padded past each
+# block's points (counted from velocity if points is not given). Returns a structured array with one row per block:
+# the coefficients a, b, c, the root mean square and largest residual and R^2. Blocks with fewer than three distinct
+# speeds have no unique fit and are all NaN
+def fit_quadratics(velocity, values, points=None):
+    velocity = np.atleast_2d(np.asarray(velocity, dtype=np.float64))
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    if points is None:
+        points = (~np.isnan(velocity)).sum(axis=1)
+    points = np.asarray(points, dtype=np.int64)
+    valid = np.arange(velocity.shape[1]) < points[:, None]
+    speed = np.where(valid, velocity, 0)
+    scale = np.abs(speed).max(axis=1)
+    lowest = np.where(valid, velocity, np.inf).min(axis=1)
+    highest = np.where(valid, velocity, -np.inf).max(axis=1)
+    fitted = (points >= 3) & (highest > lowest)
+    fits = np.full(len(points), np.nan, dtype=FIT_DTYPE)
+    if not fitted.any():
+        return fits
+
+    valid = valid[fitted]
+    x = speed[fitted] / scale[fitted, None]
+    y = np.where(valid, values[fitted], 0)
+    design = np.stack([x * x, x, np.ones_like(x)], axis=2) * valid[:, :, None]
+    q, r = np.linalg.qr(design)
+    solution = np.linalg.solve(r, np.einsum("bpk,bp->bk", q, y)[:, :, None])[:, :, 0]
+
+    residual = np.where(valid, y - np.einsum("bpk,bk->bp", design, solution), 0)
+    count = points[fitted]
+    sse = (residual * residual).sum(axis=1)
+    mean = y.sum(axis=1) / count
+    sst = (np.where(valid, y - mean[:, None], 0) ** 2).sum(axis=1)
+    fits["a"][fitted] = solution[:, 0] / scale[fitted] ** 2
+    fits["b"][fitted] = solution[:, 1] / scale[fitted]
+    fits["c"][fitted] = solution[:, 2]
+    fits["rmse"][fitted] = np.sqrt(sse / count)
+    fits["max_error"][fitted] = np.abs(residual).max(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fits["r2"][fitted] = np.where(sst > 0, 1 - sse / sst, np.where(sse > 0, np.nan, 1.0))
+    return fits
+
+
+# Function to get the [a, b, c] coefficients of fits as a (block, 3) array, rows in the order the takeoff scripts'
+# thrust_curve lists take them
+def coefficients(fits):
+    return np.stack([fits["a"], fits["b"], fits["c"]], axis=-1)
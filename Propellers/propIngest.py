@@ -0,0 +1,205 @@
+# Parallel ingestion of APC PER3 .dat files (a whole PERFILES folder) into a Parquet propeller table
+# The files are parsed (see datParser.py) in a pool of worker processes and each file's rows are streamed into
+# prop_store/rows/ through a ResultSink as soon as they arrive, a few row groups at a time, so memory only ever holds
+# the files in flight and one row group, however big the library is. One row per row of a .dat block:
+#   prop, file, diameter, pitch, rpm, then the 15 columns of the block (V, J, Pe, Ct, Cp, PWR, Torque, Thrust, ...)
+# prop_store/manifest.json records the content hash of every file ingested (see datasetVersion.py) and which part
+# file holds its rows, so a rerun only parses files that are new or have changed:
+#   python propIngest.py PERFILES2                      (every .dat file in the folder, into Propellers/prop_store)
+#   python propIngest.py PERFILES2 --max-diameter 12    (only props up to 12 inches, like the old combined csv)
+#   python propIngest.py PERFILES2 --workers 4
+
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'AirfoilScraperAndData'))
+from datasetVersion import file_hash
+from datParser import COLUMNS, DTYPE, parse_dat_text, read_header
+from resultSink import ResultSink
+
+PROP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE = os.path.join(PROP_DIR, "prop_store")
+
+MANIFEST_FILE = "manifest.json"
+ROWS_DIR = "rows"
+
+ROW_COLUMNS = ["prop", "file", "diameter", "pitch", "rpm"] + COLUMNS
+ROW_TYPES = dict({"prop": "string", "file": "string", "diameter": "float64", "pitch": "float64", "rpm": "int64"},
+                 **{name: "float64" for name in COLUMNS})
+ROW_GROUP_ROWS = 65536
+
+
+# Function to read a store's manifest, {"files": {file name: {"hash", "size", "mtime", "part", "rows", ...}}}
+def read_manifest(store=DEFAULT_STORE):
+    path = os.path.join(store, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"files": {}}
+    with open(path) as file:
+        return json.load(file)
+
+
+# Function to write a store's manifest (atomically, so a crash never leaves half of one)
+def write_manifest(manifest, store=DEFAULT_STORE):
+    path = os.path.join(store, MANIFEST_FILE)
+    with open(path + ".tmp", "w") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+# Function run in a worker process: hash one .dat file and, unless its hash is known_hash, parse it into an Arrow
+# table of its rows. Returns the file's manifest entry (without its part) and the table, None if the file is
+# unchanged or skipped. Props over max_diameter are recorded with no rows, so they are not parsed again either
+def ingest_file(path, known_hash=None, max_diameter=None):
+    import pyarrow as pa
+
+    status = os.stat(path)
+    entry = {"hash": file_hash(path), "size": status.st_size, "mtime": status.st_mtime_ns}
+    if entry["hash"] == known_hash:
+        return entry, None
+    with open(path, "r") as file:
+        text = file.read()
+    header = read_header(text)
+    entry.update(prop=header["name"], diameter=header["diameter"], pitch=header["pitch"], family=header["family"],
+                 rows=0)
+    if max_diameter is not None and (header["diameter"] is None or header["diameter"] > max_diameter):
+        return entry, None
+
+    blocks = parse_dat_text(text)
+    count = sum(len(block) for block in blocks.values())
+    entry["rows"] = count
+    columns = {"prop": pa.array([header["name"]] * count, pa.string()),
+               "file": pa.array([os.path.basename(path)] * count, pa.string()),
+               "diameter": np.full(count, np.nan if header["diameter"] is None else header["diameter"]),
+               "pitch": np.full(count, np.nan if header["pitch"] is None else header["pitch"]),
+               "rpm": np.repeat(np.array(list(blocks), dtype=np.int64), [len(block) for block in blocks.values()])}
+    rows = np.concatenate(list(blocks.values())) if blocks else np.empty(0, dtype=DTYPE)
+    for name in COLUMNS:
+        columns[name] = rows[name]
+    return entry, pa.table(columns)
+
+
+# Function to run ingest_file over (path, known hash) tasks in a process pool, yielding (path, entry, table) as the
+# files finish. Only a few files per worker are submitted at a time, so finished tables never pile up in memory
+def ingest_files(tasks, workers=None, max_diameter=None):
+    workers = workers or os.cpu_count() or 1
+    tasks = iter(tasks)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+        while True:
+            while len(in_flight) < 2 * workers:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                in_flight[pool.submit(ingest_file, task[0], task[1], max_diameter)] = task[0]
+            if not in_flight:
+                return
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for job in done:
+                path = in_flight.pop(job)
+                entry, table = job.result()
+                yield path, entry, table
+
+
+# Function to rewrite a part file keeping only the rows of files whose manifest entry still points at it, a row
+# group at a time. A part left with no rows is deleted
+def compact_part(store, part, keep):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    path = os.path.join(store, ROWS_DIR, part)
+    if not keep:
+        os.remove(path)
+        return
+    source = pq.ParquetFile(path)
+    with ResultSink(path + ".tmp", ROW_COLUMNS, types=ROW_TYPES, file_format="parquet") as sink:
+        for group in range(source.num_row_groups):
+            table = source.read_row_group(group)
+            sink.write_table(table.filter(pc.is_in(table.column("file"), value_set=pa.array(sorted(keep)))))
+    source.close()
+    os.replace(path + ".tmp", path)
+
+
+# Function to ingest every .dat file of a folder into a store. Files whose size and modification time match the
+# manifest are skipped without being read, the rest are hashed (in the workers) and only parsed if their contents
+# changed. The new rows go into one new part file, and rows of changed files are removed from the older parts
+def ingest(folder, store=DEFAULT_STORE, workers=None, max_diameter=None, row_group_rows=ROW_GROUP_ROWS):
+    import pyarrow as pa
+
+    os.makedirs(os.path.join(store, ROWS_DIR), exist_ok=True)
+    manifest = read_manifest(store)
+    files = manifest["files"]
+    if manifest.get("max_diameter") != max_diameter and files:
+        print("The store was ingested with a different --max-diameter, every file will be parsed again")
+        for entry in files.values():
+            entry["hash"] = None
+    manifest["max_diameter"] = max_diameter
+
+    tasks = []
+    for path in sorted(glob.glob(os.path.join(folder, "*.dat"))):
+        entry = files.get(os.path.basename(path))
+        status = os.stat(path)
+        if entry and entry["hash"] and (entry["size"], entry["mtime"]) == (status.st_size, status.st_mtime_ns):
+            continue
+        tasks.append((path, entry["hash"] if entry else None))
+    if not tasks:
+        print("Nothing new to ingest in " + folder)
+        return
+
+    # Parts no file points at are left from a run that never finished
+    parts = [name for name in os.listdir(os.path.join(store, ROWS_DIR)) if name.startswith("part-")]
+    for name in set(parts) - {entry.get("part") for entry in files.values()}:
+        os.remove(os.path.join(store, ROWS_DIR, name))
+    part = "part-%05d.parquet" % (max([int(name[5:10]) for name in parts], default=-1) + 1)
+    previous_parts = {name: entry.get("part") for name, entry in files.items()}
+    parsed = unchanged = 0
+    pending, pending_rows = [], 0
+    with ResultSink(os.path.join(store, ROWS_DIR, part), ROW_COLUMNS, types=ROW_TYPES, file_format="parquet") as sink:
+        for path, entry, table in ingest_files(tasks, workers, max_diameter):
+            name = os.path.basename(path)
+            if name in files and entry["hash"] == files[name]["hash"]:
+                # Contents unchanged, only the size or date moved
+                files[name].update(size=entry["size"], mtime=entry["mtime"])
+                unchanged += 1
+                continue
+            entry["part"] = part if table is not None and table.num_rows else None
+            files[name] = entry
+            parsed += 1
+            if entry["part"] is not None:
+                pending.append(table)
+                pending_rows += table.num_rows
+            if pending_rows >= row_group_rows:
+                sink.write_table(pa.concat_tables(pending))
+                pending, pending_rows = [], 0
+        if pending:
+            sink.write_table(pa.concat_tables(pending))
+        rows_written = sink.rows_written
+    if not rows_written:
+        os.remove(os.path.join(store, ROWS_DIR, part))
+
+    # Rows of the files parsed again are now stale in the parts they were in before
+    for old_part in {previous_parts[name] for name in previous_parts
+                     if previous_parts[name] and files[name].get("part") != previous_parts[name]}:
+        compact_part(store, old_part, {name for name, entry in files.items() if entry.get("part") == old_part})
+    write_manifest(manifest, store)
+    print("Parsed " + str(parsed) + " files (" + str(rows_written) + " new rows"
+          + (" in " + part if rows_written else "") + "), " + str(unchanged) + " unchanged, " + str(len(files))
+          + " files in " + store)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest a folder of APC .dat files into the propeller store")
+    parser.add_argument("folder", help="folder of PER3 .dat files, e.g. PERFILES_WEB/PERFILES2")
+    parser.add_argument("--store", default=DEFAULT_STORE)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--max-diameter", type=float, default=None, help="skip props larger than this (inches)")
+    parser.add_argument("--row-group-rows", type=int, default=ROW_GROUP_ROWS)
+    args = parser.parse_args()
+
+    ingest(args.folder, args.store, args.workers, args.max_diameter, args.row_group_rows)
@@ -0,0 +1,94 @@
+# Thrust, torque and power of a prop as a surface over (RPM, speed), built once and evaluated for whole arrays
+# The RPM blocks of a prop (from propDatabase.PropDatabase.grid or a parsed .dat file, see datParser.py) are joined
+# into one sorted array of speeds, each block's shifted past the one before it, so finding where any number of
+# (RPM, V) points fall takes two searchsorted calls and no Python loop:
+#   surface = PropSurface.from_blocks(parse_dat_file("PER3_5x45E.dat"))
+#   surface.thrust(rpm_array, velocity_array)     -> lbf, NaN outside the prop's RPM range
+#   surface.evaluate(24000, [0, 10, 20])          -> {"Thrust": ..., "Torque": ..., "PWR_W": ...}
+# Along the speed it interpolates (and extrapolates past the block's last speed) linearly like interp1d, and between
+# the two nearest RPMs linearly like np.interp, the same answers the old per call interpolation gave.
+
+import numpy as np
+
+# Columns a surface is built over by default (lbf, in-lbf, W)
+SURFACE_COLUMNS = ["Thrust", "Torque", "PWR_W"]
+
+
+class PropSurface:
+    """Linear surface over a prop's RPM blocks. rpm is the sorted RPM of each block, velocity and columns hold each
+    block's points as (block, point) grids (NaN padded past points[block])."""
+
+    def __init__(self, rpm, velocity, columns, points=None):
+        velocity = np.asarray(velocity, dtype=np.float64)
+        if points is None:
+            points = (~np.isnan(velocity)).sum(axis=1)
+        self.rpm = np.asarray(rpm, dtype=np.float64)
+        self.points = np.asarray(points, dtype=np.int64)
+        if len(self.rpm) == 0 or (self.points < 2).any() or (np.diff(self.rpm) <= 0).any():
+            raise ValueError("A surface needs RPMs in increasing order with at least two points each")
+        valid = np.arange(velocity.shape[1]) < self.points[:, None]
+        self.starts = np.concatenate(([0], np.cumsum(self.points)))
+        # Each block's speeds shifted by block * span, so the blocks sit one after another in one sorted array
+        self.span = 2 * np.nanmax(np.abs(velocity[valid])) + 1
+        self.velocity = velocity[valid]
+        self.keys = self.velocity + np.repeat(np.arange(len(self.rpm)), self.points) * self.span
+        self.columns = {name: np.asarray(values, dtype=np.float64)[valid] for name, values in columns.items()}
+
+    @classmethod
+    def from_grid(cls, grid, columns=SURFACE_COLUMNS):
+        """Surface of a prop from propDatabase.PropDatabase.grid."""
+        return cls(grid["rpm"], grid["V"], {name: grid[name] for name in columns}, grid["points"])
+
+    @classmethod
+    def from_blocks(cls, blocks, columns=SURFACE_COLUMNS):
+        """Surface of a prop from datParser.parse_dat_file ({RPM: structured array})."""
+        rpms = sorted(blocks)
+        width = max(len(blocks[rpm]) for rpm in rpms)
+        grids = {name: np.full((len(rpms), width), np.nan) for name in ["V"] + list(columns)}
+        for row, rpm in enumerate(rpms):
+            for name, grid in grids.items():
+                grid[row, :len(blocks[rpm])] = blocks[rpm][name]
+        return cls(rpms, grids.pop("V"), grids, [len(blocks[rpm]) for rpm in rpms])
+
+    def along_speed(self, block, velocity):
+        """Each column at velocity within a block (arrays of the same shape), interpolated like interp1d with
+        fill_value="extrapolate": from the two points around velocity, or the two end points outside them."""
+        start, stop = self.starts[block], self.starts[block + 1]
+        above = np.searchsorted(self.keys, velocity + block * self.span, side="left")
+        above = np.clip(above, start + 1, stop - 1)
+        below = above - 1
+        x_below, x_above = self.velocity[below], self.velocity[above]
+        values = {}
+        for name, column in self.columns.items():
+            slope = (column[above] - column[below]) / (x_above - x_below)
+            values[name] = slope * (velocity - x_below) + column[below]
+        return values
+
+    def evaluate(self, rpm, velocity, columns=None):
+        """Every column (or the ones named) at each (rpm, velocity) point, as {name: array} in the broadcast shape
+        of rpm and velocity. An RPM of the data is read from its own block, any other from the blocks either side
+        of it; outside the RPM range the values are NaN."""
+        rpm, velocity = np.broadcast_arrays(np.asarray(rpm, dtype=np.float64), np.asarray(velocity, dtype=np.float64))
+        count = len(self.rpm)
+        upper = np.clip(np.searchsorted(self.rpm, rpm, side="left"), 0, count - 1)
+        exact = self.rpm[upper] == rpm
+        lower = np.where(exact, upper, np.maximum(upper - 1, 0))
+        below = self.along_speed(lower, velocity)
+        above = self.along_speed(upper, velocity)
+        inside = (rpm >= self.rpm[0]) & (rpm <= self.rpm[-1])
+        values = {}
+        for name in columns or self.columns:
+            # The same sum np.interp does between the two RPMs, and the block itself at an RPM of the data
+            slope = (above[name] - below[name]) / np.where(upper > lower, self.rpm[upper] - self.rpm[lower], 1)
+            between = slope * (rpm - self.rpm[lower]) + below[name]
+            values[name] = np.where(inside, np.where(exact, below[name], between), np.nan)
+        return values
+
+    def thrust(self, rpm, velocity):
+        return self.evaluate(rpm, velocity, ["Thrust"])["Thrust"]
+
+    def torque(self, rpm, velocity):
+        return self.evaluate(rpm, velocity, ["Torque"])["Torque"]
+
+    def power(self, rpm, velocity):
+        return self.evaluate(rpm, velocity, ["PWR_W"])["PWR_W"]
@@ -5,87 +5,41 @@
 
 
 import numpy as np
-import pandas as pd
-from scipy.interpolate import interp1d
-from scipy.optimize import curve_fit
 import matplotlib.pyplot as plt
 
-# Function to parse the .dat file and extract data blocks for each RPM
-def parse_dat_file(file_path):
-    rpm_data = {}
-    current_rpm = None
-    data_block = []
-
-    with open(file_path, 'r') as file:
-        for line in file:
-            if "PROP RPM" in line:
-                if current_rpm is not None and data_block:
-                    rpm_data[current_rpm] = pd.DataFrame(data_block, columns=['V', 'Thrust'])
-                current_rpm = int(line.split('=')[-1].strip())
-                data_block = []
-            elif line.strip() and current_rpm is not None:
-                values = line.split()
-                if len(values) >= 8:
-                    try:
-                        velocity = float(values[0])
-                        thrust = float(values[7])
-                        data_block.append([velocity, thrust])
-                    except ValueError:
-                        continue
-
-    if current_rpm is not None and data_block:
-        rpm_data[current_rpm] = pd.DataFrame(data_block, columns=['V', 'Thrust'])
-
-    return rpm_data
-
-# Interpolation function for a given RPM and velocity, including interpolation between RPMs
-def interpolate_thrust(rpm_data, target_rpm, target_velocity):
-    available_rpms = sorted(rpm_data.keys())
-    if target_rpm in available_rpms:
-        # Direct interpolation for the target RPM
-        data = rpm_data[target_rpm]
-        thrust_interp = interp1d(data['V'], data['Thrust'], kind='linear', fill_value="extrapolate")
-        return thrust_interp(target_velocity), None
-    else:
-        # Interpolate between the two nearest RPMs
-        lower_rpm = max(r for r in available_rpms if r < target_rpm) if any(r < target_rpm for r in available_rpms) else None
-        upper_rpm = min(r for r in available_rpms if r > target_rpm) if any(r > target_rpm for r in available_rpms) else None
-
-        if lower_rpm is None or upper_rpm is None:
-            return None, "Target RPM is out of the range of available data."
-
-        # Interpolate thrust at target_velocity for both the lower and upper RPMs
-        lower_data = rpm_data[lower_rpm]
-        upper_data = rpm_data[upper_rpm]
-        lower_interp = interp1d(lower_data['V'], lower_data['Thrust'], kind='linear', fill_value="extrapolate")
-        upper_interp = interp1d(upper_data['V'], upper_data['Thrust'], kind='linear', fill_value="extrapolate")
-        thrust_lower = lower_interp(target_velocity)
-        thrust_upper = upper_interp(target_velocity)
-
-        # Interpolate between the thrust values of the two RPMs
-        thrust_interpolated = np.interp(target_rpm, [lower_rpm, upper_rpm], [thrust_lower, thrust_upper])
-        return thrust_interpolated, None
-
-# Curve fitting function for thrust as a function of velocity
+# Parses the .dat file into a structured array of all 15 columns for each RPM (see datParser.py)
+from datParser import parse_dat_file
+# Thrust, torque and power over (RPM, velocity), built once per prop
+from propSurface import PropSurface
+# Quadratic thrust curves, solved directly rather than iteratively
+from propFit import coefficients, fit_quadratics
+
+# Interpolation function for a given RPM and velocity, including interpolation between RPMs. surface is the prop's
+# PropSurface (see propSurface.py), built once; the RPMs and velocities can be single values or arrays of points
+def interpolate_thrust(surface, target_rpm, target_velocity):
+    thrust = surface.thrust(target_rpm, target_velocity)
+    if np.isnan(thrust).any():
+        return None, "Target RPM is out of the range of available data."
+    return thrust, None
+
+# Curve fitting function for thrust as a function of velocity: a closed form least squares quadratic (see propFit.py,
+# which fits every RPM of every prop at once for the prop database)
 def fit_thrust_curve(rpm_data, target_rpm):
     if target_rpm not in rpm_data:
         return None, f"RPM {target_rpm} not found in data."
 
-    def thrust_curve(velocity, a, b, c):
-        return a * velocity ** 2 + b * velocity + c
-
     data = rpm_data[target_rpm]
-    popt, _ = curve_fit(thrust_curve, data['V'], data['Thrust'])
-    return popt, None
+    return coefficients(fit_quadratics(data['V'], data['Thrust']))[0], None
 
 # Load and parse the .dat file
 file_path = 'PER3_5x45E.dat'  # Replace with your actual file path
 rpm_data = parse_dat_file(file_path)
+surface = PropSurface.from_blocks(rpm_data)
 
 # Interpolate thrust at a specific RPM and velocity
 target_rpm = 24000# Target RPM for interpolation, not directly in available RPM data
 target_velocity = 0  # Target velocity for interpolation in mph
-thrust, error = interpolate_thrust(rpm_data, target_rpm, target_velocity)
+thrust, error = interpolate_thrust(surface, target_rpm, target_velocity)
 if error:
     print(error)
 else:
@@ -2,24 +2,24 @@
 # Calculates the needed takeoff velocity and wing area at a provided takeoff distance and weight
 # Outputs all possible combos within range
 
-import csv
 import math
+import os
+import sys
 
+# The shared data tools live with the airfoil data
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'AirfoilScraperAndData'))
+from resultSink import ResultSink
+from datasetVersion import file_hash, is_fresh
 
-#Define file path of CSV with airfoil data
-csv_file_path = '../AirfoilScraperAndData/foil_data_symmetric.csv'
+# The shared polar database (see polarDatabase.py), built from the scraped polar csvs
+from polarDatabase import PolarDatabase
 
-#Open CSV File with Scraped Airfoil data. Save data to list named Data
-try:
-    with open(csv_file_path, 'r', newline='') as csvfile:
-        csv_reader = csv.reader(csvfile)
-        data = []  # List to store the CSV data
-        for row in csv_reader:
-            data.append(row)
-except FileNotFoundError:
-    print("File not found.")
-except Exception as e:
-    print(f"An error occurred: {e}")
+#Reynolds number of the polars used for each airfoil
+reynolds = 200000
+
+#Load the metrics of every polar at that Reynolds number (CLMax and the CL and CD at 0 degrees, see polarMetrics.py)
+database = PolarDatabase()
+metrics = database.metrics(reynolds=reynolds)
 
 #Function to calculate the velocity given wing area and airplane/airfoil details
 #Based on equations from https://eaglepubs.erau.edu/introductiontoaerospaceflightvehicles/chapter/takeoff-landing-performance/
@@ -62,11 +62,7 @@ def ThrustForDistance(W, g, density, WingArea, CLMax, Distance, Rav):
 
 
 file_path = "foil_takeoff_calc3_5lb.csv"
-with open(file_path, mode="w", newline="") as file:
-    writer = csv.writer(file)
-    # Write header row (optional)
-    header = ["Airfoil", "CL", "CD", "CLMax", "Vlo", "Lift", "Drag", "Average Resistance", "WingArea", "ThrustNeeded"]
-    writer.writerow(header)
+header = ["Airfoil", "CL", "CD", "CLMax", "Vlo", "Lift", "Drag", "Average Resistance", "WingArea", "ThrustNeeded"]
 
 
 
@@ -80,28 +76,40 @@ wing_area_min = .75 #ft^2
 wing_are_max = 6 #ft^2
 wing_area_step = .05
 max_thrust = 2.5
-
-
-#Pulls out an airfoil from the sheet data
-for foil in range(1,len(data)):
+takeoff_distance = 10 #ft
+
+#The polar data, settings and code the results depend on (see datasetVersion.py). A results file already made from
+#the same ones is kept instead of being worked out again
+inputs = {"polar_store": database.hash, "script": file_hash(__file__)}
+parameters = {"reynolds": reynolds, "weight": weight, "AirDensity": AirDensity, "g": g, "coefRollFrict": coefRollFrict,
+              "wing_area": [wing_area_min, wing_are_max, wing_area_step], "max_thrust": max_thrust,
+              "takeoff_distance": takeoff_distance}
+if is_fresh(file_path, inputs, parameters):
+    print(file_path + " is already up to date with the polar data and settings")
+    sys.exit()
+
+# Results are buffered and written in batches rather than reopening the file for every row
+sink = ResultSink(file_path, header, inputs=inputs, parameters=parameters)
+
+#Pulls out an airfoil's metrics
+for foil in metrics.itertuples(index=False):
     #CLMax is constant for an airfoil so it can be pulled before alphas are changed
-    CLMax = float(data[foil][17])
-    #Iterate through the alpha values and pull CL and CD for them
-    for alpha in range(2, 3, 3):
-        name = data[foil][0].split(',')[1]+"-"+data[0][alpha].split('-')[1]
-        CL = float(data[foil][alpha])
-        CD = float(data[foil][alpha+1])
+    CLMax = foil.cl_max
+    #Pull CL and CD at 0 degrees alpha
+    for alpha in [0]:
+        name = foil.Airfoil + "- " + str(alpha) + " Deg Alpha"
+        CL = foil.cl0
+        CD = foil.cd0
         if CL>0 and CD>0:
-            for WingArea in range(wing_area_min*100, wing_are_max*100, wing_area_step*100):
+            for WingArea in range(int(wing_area_min*100), int(wing_are_max*100), int(wing_area_step*100)):
                 WingArea = WingArea / 100.0
                 Vlo = NeededTakeoffVelocity(weight, AirDensity, CLMax, WingArea)
                 Lift = TakeoffLift(AirDensity, CL, WingArea, Vlo)
                 Drag = TakeoffDrag(AirDensity, CD, WingArea, Vlo)
                 Rav = TakeoffResistiveForce(Drag, coefRollFrict, weight, Lift)
-                ThrustNeeded = ThrustForDistance(weight, g, AirDensity, WingArea, CLMax, 10, Rav)
+                ThrustNeeded = ThrustForDistance(weight, g, AirDensity, WingArea, CLMax, takeoff_distance, Rav)
                 if ThrustNeeded < max_thrust:
                     # Write data to the CSV file
                     data_to_write = [name, CL, CD, CLMax, Vlo, Lift, Drag, Rav, WingArea, ThrustNeeded]
-                    with open(file_path, mode="a", newline="") as file:
-                        writer = csv.writer(file)
-                        writer.writerow(data_to_write)
+                    sink.write(data_to_write)
+sink.close()
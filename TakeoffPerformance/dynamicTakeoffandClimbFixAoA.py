@@ -1,50 +1,32 @@
 import math
-import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
-from scipy.interpolate import interp1d
-
-# Constants
-g = 32.174  # Acceleration due to gravity, ft/s^2
-
-
-# Function to read Cl and Cd data from CSV files
-def load_airfoil_data(filename, airfoil_name):
-    df = pd.read_csv(filename)
-    df = df[df["Name"].str.contains(airfoil_name, case=False, na=False)]  # Filter by airfoil name
-    reynolds_numbers = df["Reynold's Number"].unique()
-    airfoil_data = {Re: df[df["Reynold's Number"] == Re] for Re in reynolds_numbers}
-    return airfoil_data
-
+import os
+import sys
 
+# The shared data tools live with the airfoil data
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'AirfoilScraperAndData'))
+from aeroCoeffs import AeroCoeffProvider
+from polarReader import DEFAULT_TENSOR, PolarReader
 
-# Function to interpolate Cl and Cd
-def get_aero_coeffs(airfoil_data, reynolds, alpha):
-    reynolds_numbers = sorted(airfoil_data.keys())
-    lower_re = max([Re for Re in reynolds_numbers if Re <= reynolds], default=reynolds_numbers[0])
-    upper_re = min([Re for Re in reynolds_numbers if Re >= reynolds], default=reynolds_numbers[-1])
+# Thrust curves come from the propeller database
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Propellers'))
+from propDatabase import PropDatabase
 
-    lower_data = airfoil_data[lower_re]
-    upper_data = airfoil_data[upper_re]
-
-    cl_lower = interp1d(lower_data['Alpha'], lower_data['CL'], fill_value='extrapolate')(alpha)
-    cd_lower = interp1d(lower_data['Alpha'], lower_data['CD'], fill_value='extrapolate')(alpha)
-    cl_upper = interp1d(upper_data['Alpha'], upper_data['CL'], fill_value='extrapolate')(alpha)
-    cd_upper = interp1d(upper_data['Alpha'], upper_data['CD'], fill_value='extrapolate')(alpha)
-
-    if lower_re == upper_re:
-        return cl_lower, cd_lower
+# Constants
+g = 32.174  # Acceleration due to gravity, ft/s^2
 
-    re_ratio = (reynolds - lower_re) / (upper_re - lower_re)
-    cl = cl_lower + re_ratio * (cl_upper - cl_lower)
-    cd = cd_lower + re_ratio * (cd_upper - cd_lower)
 
-    return cl, cd
+# Function to read Cl and Cd data from the compiled polar tensor (see polarReader.py, it only needs numpy)
+def load_airfoil_data(tensor_dir, airfoil_name):
+    reader = PolarReader(tensor_dir)
+    matches = reader.match(airfoil_name)  # Find the airfoil by name, an exact match first
+    if not matches:
+        return {}
+    return reader.airfoil_data(matches[0])
 
 
 # Function to simulate takeoff and climb
 def takeoff_and_climb_simulation(wing_area, mass, rho, runway_length, simulation_length, step_size, chord_length, kinematic_viscosity,
-                                 thrust_curve, airfoil_data):
+                                 thrust_curve, aero_coeffs):
     weight = mass * g
     position, velocity, altitude, time = 0, 0, 0, 0.0
     alpha = 0
@@ -53,7 +35,7 @@ def takeoff_and_climb_simulation(wing_area, mass, rho, runway_length, simulation
 
     while position < simulation_length:
         reynolds = (velocity * chord_length) / kinematic_viscosity
-        cl, cd = get_aero_coeffs(airfoil_data, reynolds, alpha)
+        cl, cd = aero_coeffs.coeffs(reynolds, alpha)
 
         lift = 0.5 * rho * cl * wing_area * velocity ** 2
         drag = 0.5 * rho * cd * wing_area * velocity ** 2
@@ -77,6 +59,9 @@ def takeoff_and_climb_simulation(wing_area, mass, rho, runway_length, simulation
         alpha_list.append(alpha)
         time += step_size
 
+    # matplotlib is only imported once there is something to plot
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(12, 6))
     plt.subplot(3, 2, 1)
     plt.plot(position_list, thrust_list, label='Thrust')
@@ -128,7 +113,8 @@ def takeoff_and_climb_simulation(wing_area, mass, rho, runway_length, simulation
 selected_airfoil = "Airfoil,clarkysm-il"  # Change this to the airfoil of interest
 
 # Load data only for that airfoil
-airfoil_data = load_airfoil_data('../AirfoilScraperAndData/foil_data_new_pg1-80.csv', selected_airfoil)
+# Interpolants are built once here, not on every timestep
+aero_coeffs = AeroCoeffProvider(load_airfoil_data(DEFAULT_TENSOR, selected_airfoil))
 
 # Example parameters
 wing_area = 5
@@ -139,8 +125,11 @@ simulation_length = 100 # Distance in feet
 step_size = 0.001
 chord_length = 12 / 12
 kinematic_viscosity = 0.00015723
-thrust_curve = [-1.34264307e-04, -2.03613928e-03,  2.23465198e+00]
+selected_prop = "5x4.5E"  # Change this to your propeller (python propDatabase.py query lists them)
+prop_rpm = 24000
+# The prop's fitted thrust curve at the RPM of its data nearest prop_rpm, read from the prop database
+thrust_curve, _ = PropDatabase().thrust_curve(selected_prop, prop_rpm)
 
 # Run simulation
 takeoff_and_climb_simulation(wing_area, mass, rho, runway_length, simulation_length, step_size, chord_length, kinematic_viscosity,
-                             thrust_curve, airfoil_data)
+                             thrust_curve, aero_coeffs)
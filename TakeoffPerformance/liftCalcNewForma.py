@@ -1,20 +1,33 @@
-import pandas as pd
 import math
-import csv
 import os
-
-# --- Define the name of the input file ---
-file_name = '../AirfoilScraperAndData/foil_data_symmetric.csv'
-
-# --- Safety Check: Ensure the file exists before running ---
-if not os.path.exists(file_name):
-    print(f"FATAL ERROR: The input file '{file_name}' was not found.")
-    print("Please ensure the CSV file is uploaded and accessible.")
+import sys
+import numpy as np
+
+# The shared data tools live with the airfoil data
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'AirfoilScraperAndData'))
+from resultSink import ResultSink
+from datasetVersion import combined_hash, file_hash, is_fresh
+from polarDatabase import PolarDatabase
+from polarReader import decimal
+from polarTensor import PolarTensor
+
+# --- The airfoils to analyse: the symmetric family of the polar database (see polarDatabase.py) ---
+database = PolarDatabase()
+symmetric_airfoils = set(database.airfoils("symmetric"))
+
+# --- Safety Check: Ensure there are symmetric airfoils before running ---
+if not symmetric_airfoils:
+    print("FATAL ERROR: The polar database has no symmetric airfoils.")
+    print("Please ensure the scraped polar csvs are in AirfoilScraperAndData and rebuild it.")
 else:
-    # --- If file exists, proceed with the full program ---
-    print(f"Successfully located '{file_name}'. Starting analysis...")
+    # --- If they exist, proceed with the full program ---
+    print(f"Found {len(symmetric_airfoils)} symmetric airfoils. Starting analysis...")
 
-    df = pd.read_csv(file_name)
+    # The polars are read from the shared coefficient tensor (see polarTensor.py), compiled from the scraped csvs
+    tensor = PolarTensor()
+    # CLMax of every polar comes from the metrics table worked out when the database was built (see polarMetrics.py)
+    metrics = database.metrics()
+    polar_cl_max = dict(zip(zip(metrics['Airfoil'], metrics["Reynold's Number"]), metrics['cl_max']))
 
     # --- User-defined constants and parameters ---
     weight = 3  # pounds
@@ -66,62 +79,73 @@ else:
         "Airfoil", "Reynolds_Number", "Alpha", "CL", "CD", "CLMax",
         "Wing_Area_sq_ft", "Takeoff_Velocity_ft_s", "Thrust_Needed_lbs"
     ]
-    with open(output_file_path, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(header)
-
-    # Clean the 'Name' column to get a simple airfoil identifier
-    df['Airfoil'] = df['Name'].apply(lambda x: x.split(',')[1].strip())
-
-    # Group data by each unique airfoil and Reynold's number combination
-    grouped = df.groupby(['Airfoil', "Reynold's Number"])
-
-    # Main processing loop
-    for (airfoil_name, reynolds_num), subset_df in grouped:
-
-        # Determine CLMax for this specific configuration
-        CLMax = subset_df['CL'].max()
+    # The polar data, airfoils, settings and code the results depend on (see datasetVersion.py). A results file
+    # already made from the same ones is kept instead of being worked out again
+    inputs = {"polar_store": database.hash, "airfoils": combined_hash({name: "symmetric" for name in symmetric_airfoils}),
+              "script": file_hash(__file__)}
+    parameters = {"weight": weight, "AirDensity": AirDensity, "g": g, "coefRollFrict": coefRollFrict,
+                  "wing_area": [wing_area_min, wing_area_max, wing_area_step], "max_thrust": max_thrust,
+                  "takeoff_distance": takeoff_distance}
+    if is_fresh(output_file_path, inputs, parameters):
+        print(f"\n'{output_file_path}' is already up to date with the polar data and settings")
+    else:
+        # Results are buffered and written in batches rather than reopening the file for every row
+        sink = ResultSink(output_file_path, header, inputs=inputs, parameters=parameters)
+
+        # Main processing loop, over each airfoil and Reynold's number cell of the tensor
+        for airfoil_slot, reynolds_slot in np.ndindex(tensor.cl.shape[:2]):
+            airfoil_name = tensor.airfoils[airfoil_slot]
+            if airfoil_name not in symmetric_airfoils:
+                continue
+            reynolds_num = tensor.reynolds[reynolds_slot]
+            valid = tensor.mask[airfoil_slot, reynolds_slot]
+            if not valid.any():
+                continue  # No polar for this airfoil at this Reynold's number
 
-        if CLMax <= 0:
-            continue  # Cannot generate lift, skip this entire airfoil/Re combo
+            # Determine CLMax for this specific configuration
+            CLMax = polar_cl_max[(airfoil_name, reynolds_num)]
 
-        # Iterate through each angle of attack for this configuration
-        for index, row in subset_df.iterrows():
-            CL = row['CL']
-            CD = row['CD']
-            alpha = row['Alpha']
+            if CLMax <= 0:
+                continue  # Cannot generate lift, skip this entire airfoil/Re combo
 
-            if CL <= 0 or CD <= 0 or alpha != 0:
-                continue
+            # Iterate through each angle of attack for this configuration
+            for alpha_slot in np.flatnonzero(valid):
+                CL = decimal(tensor.cl[airfoil_slot, reynolds_slot, alpha_slot])
+                CD = decimal(tensor.cd[airfoil_slot, reynolds_slot, alpha_slot])
+                alpha = float(tensor.alpha[alpha_slot])
 
-            # Iterate through the specified range of wing areas
-            current_wing_area = wing_area_min
-            while current_wing_area <= wing_area_max:
-                Vlo = NeededTakeoffVelocity(weight, AirDensity, CLMax, current_wing_area)
-                if math.isinf(Vlo):
-                    current_wing_area += wing_area_step
+                if CL <= 0 or CD <= 0 or alpha != 0:
                     continue
 
-                Lift = TakeoffLift(AirDensity, CL, current_wing_area, Vlo)
-                Drag = TakeoffDrag(AirDensity, CD, current_wing_area, Vlo)
-                Rav = TakeoffResistiveForce(Drag, coefRollFrict, weight, Lift)
-                ThrustNeeded = ThrustForDistance(weight, g, AirDensity, current_wing_area, CLMax, takeoff_distance, Rav)
+                # Iterate through the specified range of wing areas
+                current_wing_area = wing_area_min
+                while current_wing_area <= wing_area_max:
+                    Vlo = NeededTakeoffVelocity(weight, AirDensity, CLMax, current_wing_area)
+                    if math.isinf(Vlo):
+                        current_wing_area += wing_area_step
+                        continue
+
+                    Lift = TakeoffLift(AirDensity, CL, current_wing_area, Vlo)
+                    Drag = TakeoffDrag(AirDensity, CD, current_wing_area, Vlo)
+                    Rav = TakeoffResistiveForce(Drag, coefRollFrict, weight, Lift)
+                    ThrustNeeded = ThrustForDistance(weight, g, AirDensity, current_wing_area, CLMax, takeoff_distance, Rav)
+
+                    if ThrustNeeded < max_thrust:
+                        # If required thrust is within limits, save the results
+                        data_to_write = [
+                            airfoil_name, reynolds_num, alpha, CL, CD, CLMax,
+                            round(current_wing_area, 3), round(Vlo, 2), round(ThrustNeeded, 2)
+                        ]
+                        sink.write(data_to_write)
 
-                if ThrustNeeded < max_thrust:
-                    # If required thrust is within limits, save the results
-                    data_to_write = [
-                        airfoil_name, reynolds_num, alpha, CL, CD, CLMax,
-                        round(current_wing_area, 3), round(Vlo, 2), round(ThrustNeeded, 2)
-                    ]
-                    with open(output_file_path, mode="a", newline="") as file:
-                        writer = csv.writer(file)
-                        writer.writerow(data_to_write)
+                    current_wing_area += wing_area_step
 
-                current_wing_area += wing_area_step
+        sink.close()
+        print(f"\nProcessing complete. Results are saved in '{output_file_path}'")
 
-    print(f"\nProcessing complete. Results are saved in '{output_file_path}'")
+    # Display the head of the results file (pandas is only imported for this)
+    import pandas as pd
 
-    # Display the head of the results file
     results_df = pd.read_csv(output_file_path)
     print(f"Found {len(results_df)} possible design combinations.")
     print("\nHere are the first 10 results:")